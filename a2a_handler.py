@@ -1,8 +1,16 @@
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple, Union, Callable, Awaitable, AsyncIterator
 from pydantic import BaseModel
+from fastapi import Request, Response
 import uuid
 import os
-from datetime import datetime
+import re
+import time
+import hashlib
+import asyncio
+from datetime import datetime, timezone
+from serialization import dumps
+from metrics import skill_requests, skill_latency
+from tracing import span
 
 
 class A2AMessage(BaseModel):
@@ -15,6 +23,8 @@ class A2ATaskRequest(BaseModel):
     messages: List[A2AMessage]
     skill_id: Optional[str] = None
     parameters: Optional[Dict[str, Any]] = None
+    stream: Optional[bool] = None
+    background: Optional[bool] = None
 
 
 class A2ATaskResponse(BaseModel):
@@ -25,6 +35,150 @@ class A2ATaskResponse(BaseModel):
     timestamp: str
 
 
+SkillHandler = Callable[
+    [str, Dict[str, Any], Optional[Callable[[Dict[str, Any]], None]]],
+    Awaitable[Dict[str, Any]]
+]
+
+SESSION_ID_PATTERN = r'session[_\s]+(?:id[:\s]+)?([a-zA-Z0-9-]+)'
+PROBLEM_ID_PATTERN = r'problem[_\s]+(?:id[:\s]+)?([0-9]+)'
+SOLUTION_PATTERN = r'(?:solution|answer)[:\s]+([^\n]+)'
+PARTICIPANT_URL_PATTERN = r'(https?://[^\s,;]+)'
+
+
+class Skill:
+    def __init__(
+        self,
+        skill_id: str,
+        name: str,
+        description: str,
+        handler: SkillHandler,
+        parameters: Optional[Dict[str, Dict[str, Any]]] = None,
+        extractors: Optional[Dict[str, str]] = None,
+        idempotent: bool = False
+    ):
+        self.id = skill_id
+        self.name = name
+        self.description = description
+        self.handler = handler
+        self.parameters = parameters or {}
+        # A repeated task_id or Idempotency-Key replays the first response instead of running again.
+        self.idempotent = idempotent
+        self.extractors = {
+            parameter: re.compile(pattern, re.IGNORECASE)
+            for parameter, pattern in (extractors or {}).items()
+        }
+
+    def card(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "parameters": self.parameters
+        }
+
+    def extract_parameters(self, content: str) -> Dict[str, Any]:
+        parameters = {}
+        for parameter, pattern in self.extractors.items():
+            match = pattern.search(content)
+            if match:
+                parameters[parameter] = match.group(1).strip()
+        return parameters
+
+
+class SkillRegistry:
+    def __init__(self, name: str):
+        self.name = name
+        self._skills: Dict[str, Skill] = {}
+        self._intents: List[Tuple[str, str]] = []
+        self._intent_re: Optional[re.Pattern] = None
+
+    def skill(
+        self,
+        skill_id: str,
+        name: str,
+        description: str,
+        parameters: Optional[Dict[str, Dict[str, Any]]] = None,
+        intents: Tuple[str, ...] = (),
+        extractors: Optional[Dict[str, str]] = None,
+        idempotent: bool = False
+    ) -> Callable[[SkillHandler], SkillHandler]:
+        def register(handler: SkillHandler) -> SkillHandler:
+            self.add(
+                Skill(skill_id, name, description, handler, parameters, extractors, idempotent),
+                intents
+            )
+            return handler
+        return register
+
+    def add(self, skill: Skill, intents: Tuple[str, ...] = ()) -> None:
+        self._skills[skill.id] = skill
+        self._intents.extend((skill.id, intent) for intent in intents)
+        # One alternation with a named group per intent; registration order is priority.
+        self._intent_re = re.compile(
+            "|".join(f"(?P<i{i}>{re.escape(intent)})" for i, (_, intent) in enumerate(self._intents)),
+            re.IGNORECASE
+        ) if self._intents else None
+
+    def get(self, skill_id: Optional[str]) -> Optional[Skill]:
+        return self._skills.get(skill_id) if skill_id else None
+
+    def card_skills(self) -> List[Dict[str, Any]]:
+        return [skill.card() for skill in self._skills.values()]
+
+    def route(self, messages: List[A2AMessage]) -> Tuple[Optional[str], Dict[str, Any]]:
+        if not messages or self._intent_re is None:
+            return None, {}
+
+        with span("a2a.route"):
+            content = messages[-1].content
+            best: Optional[int] = None
+            for match in self._intent_re.finditer(content):
+                index = int(match.lastgroup[1:])
+                if best is None or index < best:
+                    best = index
+                    if best == 0:
+                        break
+
+            if best is None:
+                return None, {}
+
+            skill = self._skills[self._intents[best][0]]
+            return skill.id, skill.extract_parameters(content)
+
+    async def dispatch(
+        self,
+        task_id: str,
+        skill_id: Optional[str],
+        parameters: Dict[str, Any],
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        skill = self.get(skill_id)
+
+        if skill is None:
+            skill_requests.inc(self.name, "unknown", "failed")
+            return create_a2a_response(
+                task_id=task_id,
+                status="failed",
+                error=f"Unknown skill: {skill_id}"
+            )
+
+        started = time.perf_counter()
+        status = "error"
+        try:
+            with span(f"skill.{skill.id}"):
+                response = await skill.handler(task_id, parameters, on_partial)
+            status = response.get("status", "completed")
+            return response
+        finally:
+            skill_requests.inc(self.name, skill.id, status)
+            skill_latency.observe(time.perf_counter() - started, self.name, skill.id)
+
+
+agent_skills = SkillRegistry("agent")
+launcher_skills = SkillRegistry("launcher")
+
+
 class A2AAgentCard:
     @staticmethod
     def get_agent_card() -> Dict[str, Any]:
@@ -37,46 +191,14 @@ class A2AAgentCard:
                 {
                     "version": "1.0.0",
                     "endpoint": f"{agent_url}/a2a",
-                    "supports_streaming": False,
+                    "supports_streaming": True,
                     "auth": {
                         "type": "none"
                     }
                 }
             ],
             "capabilities": {
-                "skills": [
-                    {
-                        "id": "get_math_problem",
-                        "name": "Get Math Problem",
-                        "description": "Provides a random math problem from the curated problem set",
-                        "parameters": {
-                            "session_id": {
-                                "type": "string",
-                                "required": True,
-                                "description": "Session identifier to track problem distribution"
-                            }
-                        }
-                    },
-                    {
-                        "id": "evaluate_solution",
-                        "name": "Evaluate Math Solution",
-                        "description": "Evaluates a submitted math solution using GPT-5",
-                        "parameters": {
-                            "session_id": {
-                                "type": "string",
-                                "required": True
-                            },
-                            "problem_id": {
-                                "type": "string",
-                                "required": True
-                            },
-                            "solution": {
-                                "type": "string",
-                                "required": True
-                            }
-                        }
-                    }
-                ]
+                "skills": agent_skills.card_skills()
             },
             "contact_email": "ra.singh069@gmail.com"
         }
@@ -92,39 +214,57 @@ class A2AAgentCard:
                 {
                     "version": "1.0.0",
                     "endpoint": f"{launcher_url}/a2a",
-                    "supports_streaming": False,
+                    "supports_streaming": True,
                     "auth": {
                         "type": "none"
                     }
                 }
             ],
             "capabilities": {
-                "skills": [
-                    {
-                        "id": "start_session",
-                        "name": "Start Evaluation Session",
-                        "description": "Creates a new evaluation session",
-                        "parameters": {}
-                    },
-                    {
-                        "id": "get_session_status",
-                        "name": "Get Session Status",
-                        "description": "Retrieves current session status",
-                        "parameters": {
-                            "session_id": {
-                                "type": "string",
-                                "required": True
-                            }
-                        }
-                    }
-                ]
+                "skills": launcher_skills.card_skills()
             },
             "contact_email": "support@agenticai.example.com"
         }
 
 
-def parse_a2a_request(data: Dict[str, Any]) -> A2ATaskRequest:
-    return A2ATaskRequest(**data)
+class CachedCard:
+    def __init__(self, build: Callable[[], Dict[str, Any]], max_age: int = 300):
+        self.build = build
+        self.max_age = max_age
+        self.body = b""
+        self.etag = ""
+        self.headers: Dict[str, str] = {}
+
+    def refresh(self) -> None:
+        self.body = dumps(self.build())
+        self.etag = '"' + hashlib.sha256(self.body).hexdigest()[:32] + '"'
+        self.headers = {
+            "ETag": self.etag,
+            "Cache-Control": f"public, max-age={self.max_age}"
+        }
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        for tag in if_none_match.split(","):
+            tag = tag.strip()
+            if tag == "*" or tag.removeprefix("W/") == self.etag:
+                return True
+        return False
+
+    def response(self, request: Request) -> Response:
+        if not self.body:
+            self.refresh()
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=self.headers)
+        return Response(content=self.body, media_type="application/json", headers=self.headers)
+
+
+def parse_a2a_request(data: Union[bytes, str, Dict[str, Any]]) -> A2ATaskRequest:
+    with span("a2a.parse"):
+        if isinstance(data, (bytes, str)):
+            return A2ATaskRequest.model_validate_json(data)
+        return A2ATaskRequest.model_validate(data)
 
 
 def create_a2a_response(
@@ -133,61 +273,66 @@ def create_a2a_response(
     result: Optional[Dict[str, Any]] = None,
     error: Optional[str] = None
 ) -> Dict[str, Any]:
-    if not task_id:
-        task_id = str(uuid.uuid4())
-    
-    response = A2ATaskResponse(
-        task_id=task_id,
-        status=status,
-        result=result,
-        error=error,
-        timestamp=datetime.utcnow().isoformat() + "Z"
-    )
+    # Same shape as A2ATaskResponse.model_dump(exclude_none=True), without the model round trip.
+    response = {
+        "task_id": task_id or str(uuid.uuid4()),
+        "status": status
+    }
+    if result is not None:
+        response["result"] = result
+    if error is not None:
+        response["error"] = error
+    response["timestamp"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
     
-    return response.model_dump(exclude_none=True)
+    return response
 
 
-def extract_skill_from_messages(messages: List[A2AMessage]) -> tuple[Optional[str], Dict[str, Any]]:
-    if not messages:
-        return None, {}
-    
-    last_message = messages[-1]
-    content = last_message.content
-    
-    parameters = {}
-    skill_id = None
-    
-    if "get problem" in content.lower() or "math problem" in content.lower():
-        skill_id = "get_math_problem"
-        if "session" in content.lower():
-            import re
-            session_match = re.search(r'session[_\s]+(?:id[:\s]+)?([a-zA-Z0-9-]+)', content, re.IGNORECASE)
-            if session_match:
-                parameters["session_id"] = session_match.group(1)
-    
-    elif "evaluate" in content.lower() or "grade" in content.lower() or "check" in content.lower():
-        skill_id = "evaluate_solution"
-        import re
-        session_match = re.search(r'session[_\s]+(?:id[:\s]+)?([a-zA-Z0-9-]+)', content, re.IGNORECASE)
-        problem_match = re.search(r'problem[_\s]+(?:id[:\s]+)?([0-9]+)', content, re.IGNORECASE)
-        solution_match = re.search(r'(?:solution|answer)[:\s]+([^\n]+)', content, re.IGNORECASE)
-        
-        if session_match:
-            parameters["session_id"] = session_match.group(1)
-        if problem_match:
-            parameters["problem_id"] = problem_match.group(1)
-        if solution_match:
-            parameters["solution"] = solution_match.group(1).strip()
-    
-    elif "start session" in content.lower() or "new session" in content.lower():
-        skill_id = "start_session"
-    
-    elif "session status" in content.lower() or "check session" in content.lower():
-        skill_id = "get_session_status"
-        import re
-        session_match = re.search(r'session[_\s]+(?:id[:\s]+)?([a-zA-Z0-9-]+)', content, re.IGNORECASE)
-        if session_match:
-            parameters["session_id"] = session_match.group(1)
-    
-    return skill_id, parameters
+def wants_stream(request: Request, a2a_request: A2ATaskRequest) -> bool:
+    if a2a_request.stream is not None:
+        return a2a_request.stream
+    return "text/event-stream" in request.headers.get("accept", "")
+
+
+def format_sse_event(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+
+async def stream_task_events(
+    task_id: str,
+    run: Callable[[Callable[[Dict[str, Any]], None]], Awaitable[Dict[str, Any]]]
+) -> AsyncIterator[str]:
+    partials: asyncio.Queue = asyncio.Queue()
+    task = asyncio.create_task(run(partials.put_nowait))
+
+    yield format_sse_event("status", create_a2a_response(task_id=task_id, status="working"))
+
+    try:
+        while not task.done() or not partials.empty():
+            if partials.empty():
+                getter = asyncio.ensure_future(partials.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    continue
+                partial = getter.result()
+            else:
+                partial = partials.get_nowait()
+
+            yield format_sse_event(
+                "partial",
+                create_a2a_response(task_id=task_id, status="working", result=partial)
+            )
+
+        try:
+            final = task.result()
+        except Exception as e:
+            final = create_a2a_response(
+                task_id=task_id,
+                status="failed",
+                error=f"Error processing request: {str(e)}"
+            )
 
+        yield format_sse_event("final", final)
+    finally:
+        if not task.done():
+            task.cancel()
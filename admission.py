@@ -0,0 +1,158 @@
+import os
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Optional, AsyncIterator
+from metrics import admission_rejections, admission_wait
+from tracing import span
+
+
+class AdmissionRejected(Exception):
+    def __init__(self, message: str, status_code: int = 503, retry_after: float = 1):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    def headers(self) -> Dict[str, str]:
+        return {"Retry-After": str(math.ceil(self.retry_after))}
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_active: int = 128,
+        max_queue: int = 1024,
+        max_queue_per_key: int = 64,
+        queue_timeout: float = 10
+    ):
+        self.max_active = max_active
+        self.max_queue = max_queue
+        self.max_queue_per_key = max_queue_per_key
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        # One FIFO per session or caller, served round-robin so a single busy
+        # caller cannot starve everyone queued behind it.
+        self._queues: "OrderedDict[str, deque]" = OrderedDict()
+        self._service_time = 0.0
+        self.admitted = 0
+        self.rejected = 0
+
+    @classmethod
+    def from_env(cls) -> "AdmissionController":
+        return cls(
+            max_active=int(os.getenv("ADMISSION_MAX_ACTIVE", "128")),
+            max_queue=int(os.getenv("ADMISSION_QUEUE_SIZE", "1024")),
+            max_queue_per_key=int(os.getenv("ADMISSION_QUEUE_PER_KEY", "64")),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "10"))
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_active > 0
+
+    def estimated_wait(self, position: Optional[int] = None) -> float:
+        position = self.queued if position is None else position
+        return self._service_time * (position + 1) / self.max_active
+
+    def _reject(self, reason: str, message: str, status_code: int, retry_after: float) -> AdmissionRejected:
+        self.rejected += 1
+        admission_rejections.inc(reason)
+        return AdmissionRejected(message, status_code, max(retry_after, 1))
+
+    async def acquire(self, key: str) -> None:
+        if self.active < self.max_active and self.queued == 0:
+            self.active += 1
+            self.admitted += 1
+            admission_wait.observe(0.0)
+            return
+
+        queue = self._queues.get(key)
+        if queue is not None and len(queue) >= self.max_queue_per_key:
+            raise self._reject(
+                "per_key", "Too many queued requests for this session or caller", 429, self.estimated_wait(len(queue))
+            )
+        if self.queued >= self.max_queue:
+            raise self._reject("queue_full", "Server is overloaded, retry later", 503, self.estimated_wait())
+        if self.estimated_wait() > self.queue_timeout:
+            # It would time out anyway; reject now instead of holding the connection.
+            raise self._reject("deadline", "Server is overloaded, retry later", 503, self.estimated_wait())
+
+        if queue is None:
+            queue = self._queues[key] = deque()
+        waiter = asyncio.get_running_loop().create_future()
+        queue.append(waiter)
+        self.queued += 1
+        started = time.perf_counter()
+
+        try:
+            with span("admission.wait"):
+                await asyncio.wait_for(waiter, self.queue_timeout)
+        except BaseException as e:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was handed over just as the wait ended.
+                if isinstance(e, asyncio.CancelledError):
+                    self.release()
+                    raise
+            else:
+                self._discard(key, waiter)
+                if isinstance(e, asyncio.TimeoutError):
+                    raise self._reject("timeout", "Timed out waiting for a grading slot", 503, self.estimated_wait())
+                raise
+
+        self.admitted += 1
+        admission_wait.observe(time.perf_counter() - started)
+
+    def _discard(self, key: str, waiter: asyncio.Future) -> None:
+        queue = self._queues.get(key)
+        if queue is None:
+            return
+        try:
+            queue.remove(waiter)
+        except ValueError:
+            return
+        self.queued -= 1
+        if not queue:
+            del self._queues[key]
+
+    def release(self) -> None:
+        while self._queues:
+            key, queue = next(iter(self._queues.items()))
+            waiter = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self._queues.move_to_end(key)
+            else:
+                del self._queues[key]
+            if not waiter.done():
+                # Hand the slot straight to the next caller; active stays the same.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def admit(self, key: str) -> AsyncIterator[None]:
+        if not self.enabled:
+            yield
+            return
+
+        await self.acquire(key)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self._service_time = 0.9 * self._service_time + 0.1 * elapsed if self._service_time else elapsed
+            self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "queued": self.queued,
+            "queued_keys": len(self._queues),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "estimated_wait": round(self.estimated_wait(), 3)
+        }
@@ -0,0 +1,433 @@
+import re
+import ast
+import math
+from fractions import Fraction
+from typing import Dict, Any, List, Optional, Tuple, Union, Iterable
+
+Number = Union[Fraction, float]
+
+_WHITESPACE_RE = re.compile(r"\s+")
+_ANSWER_PREFIX_RE = re.compile(
+    r"^(?:(?:the\s+)?(?:final\s+)?answer(?:\s+is)?\s*[:=]?\s*|[a-z]\s*=\s*)"
+)
+_THOUSANDS_RE = re.compile(r"(?<![\d.,])\d{1,3}(?:,\d{3})+(?![\d,])")
+_PERCENT_WORD_RE = re.compile(r"\s*(?:percent|per cent)$")
+_RADICAL_RE = re.compile(r"√\s*(\d+(?:\.\d+)?|[a-z])")
+_IMPLICIT_PRODUCT_RE = re.compile(r"(\d|\))(?=[a-df-z(])|(\))(?=\d)")
+_VARIABLE_POINTS = (Fraction(2, 7), Fraction(-3, 11), Fraction(5, 13))
+_MAX_EXPRESSION_LENGTH = 64
+_WRONG_ANSWER_TOLERANCE = 0.01
+_SET_BRACES_RE = re.compile(r"^[{\[]\s*(.*?)\s*[}\]]$")
+_SET_SEPARATOR_RE = re.compile(r"\s*(?:[,;]|\bor\b|\band\b)\s*")
+_PLUS_MINUS_RE = re.compile(r"^(.*?)\s*(?:±|\+/-|\+-)\s*(.+)$")
+_APPROXIMATE_RE = re.compile(r"^(?:[a-z]\s*≈\s*|(?:≈|~|approximately|approx\.?|about|roughly)\s*)")
+_DECIMALS_RE = re.compile(r"\d\.(\d+)")
+_KNOWN_UNITS = frozenset({
+    "°", "degrees", "mm", "cm", "m", "km", "meters", "metres", "centimeters", "kilometers",
+    "in", "inches", "ft", "feet", "yd", "yards", "mi", "miles",
+    "mg", "g", "kg", "grams", "kilograms", "lb", "lbs", "pounds", "oz", "ounces",
+    "ml", "l", "liters", "litres", "gallons",
+    "s", "sec", "seconds", "min", "minutes", "h", "hr", "hours", "days", "weeks", "months", "years",
+    "mph", "kmh", "km/h", "m/s", "miles per hour", "kilometers per hour", "meters per second",
+    "units", "sq units", "square units", "square meters", "square feet", "cubic units",
+    "dollars"
+})
+# Only known units are stripped. Any other trailing word ("5 thousand", "4% decrease",
+# "42 is incorrect") can change the meaning, so the answer is left to the LLM.
+_UNIT_SUFFIX_RE = re.compile(
+    r"(?:(?<=\d)|\s+)(" + "|".join(
+        re.escape(unit).replace(r"\ ", r"\s+")
+        for unit in sorted(_KNOWN_UNITS, key=len, reverse=True)
+    ) + r")(?:\^?[23²³])?$"
+)
+_NUMBER_TOKEN_RE = re.compile(r"-?\d+(?:\.\d+)?(?:/\d+)?%?")
+_MAX_SET_SIZE = 16
+_MAX_LEAN_TOKENS = 32
+
+
+def normalize_answer(text: str) -> str:
+    text = _WHITESPACE_RE.sub(" ", str(text).strip().lower())
+    text = (
+        text.replace("−", "-")
+        .replace("×", "*")
+        .replace("·", "*")
+        .replace("÷", "/")
+    )
+    text = text.rstrip(".").strip()
+    text = _ANSWER_PREFIX_RE.sub("", text)
+    text = text.lstrip("$€£").strip()
+    return _THOUSANDS_RE.sub(lambda m: m.group(0).replace(",", ""), text)
+
+
+def _eval_node(node: ast.AST, env: Dict[str, Fraction]) -> Number:
+    if isinstance(node, ast.Expression):
+        return _eval_node(node.body, env)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)) and not isinstance(node.value, bool):
+        return Fraction(repr(node.value))
+
+    if isinstance(node, ast.Name):
+        if node.id == "pi":
+            return math.pi
+        if node.id in env:
+            return env[node.id]
+        raise ValueError(f"Unbound name: {node.id}")
+
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.UAdd, ast.USub)):
+        value = _eval_node(node.operand, env)
+        return -value if isinstance(node.op, ast.USub) else value
+
+    if isinstance(node, ast.BinOp):
+        left = _eval_node(node.left, env)
+        right = _eval_node(node.right, env)
+        if isinstance(node.op, ast.Add):
+            return left + right
+        if isinstance(node.op, ast.Sub):
+            return left - right
+        if isinstance(node.op, ast.Mult):
+            return left * right
+        if isinstance(node.op, ast.Div):
+            if right == 0:
+                raise ZeroDivisionError("division by zero")
+            return left / right
+        if isinstance(node.op, ast.Pow):
+            if abs(right) > 64 or abs(left) > 10 ** 6:
+                raise ValueError("Exponent too large")
+            if isinstance(right, Fraction) and right.denominator == 1:
+                if left == 0 and right < 0:
+                    raise ZeroDivisionError("division by zero")
+                return left ** int(right)
+            if left < 0:
+                raise ValueError("Complex result")
+            return float(left) ** float(right)
+
+    if (
+        isinstance(node, ast.Call)
+        and isinstance(node.func, ast.Name)
+        and node.func.id == "sqrt"
+        and len(node.args) == 1
+        and not node.keywords
+    ):
+        value = _eval_node(node.args[0], env)
+        if value < 0:
+            raise ValueError("Complex result")
+        if isinstance(value, Fraction):
+            num, den = math.isqrt(value.numerator), math.isqrt(value.denominator)
+            if num * num == value.numerator and den * den == value.denominator:
+                return Fraction(num, den)
+        return math.sqrt(value)
+
+    raise ValueError(f"Unsupported expression: {ast.dump(node)}")
+
+
+def _parse_expression(text: str) -> Optional[Tuple[ast.Expression, frozenset]]:
+    if not text or len(text) > _MAX_EXPRESSION_LENGTH:
+        return None
+
+    text = _RADICAL_RE.sub(r"sqrt(\1)", text).replace("√", "sqrt")
+    text = text.replace("^", "**").replace("²", "**2").replace("³", "**3")
+    text = _IMPLICIT_PRODUCT_RE.sub(lambda m: (m.group(1) or m.group(2)) + "*", text)
+
+    try:
+        tree = ast.parse(text, mode="eval")
+    except (SyntaxError, ValueError):
+        return None
+
+    variables = frozenset(
+        node.id for node in ast.walk(tree)
+        if isinstance(node, ast.Name) and len(node.id) == 1
+    )
+    return tree, variables
+
+
+class ParsedValue:
+    __slots__ = ("tree", "variables", "percent", "constant")
+
+    def __init__(self, tree: ast.Expression, variables: frozenset, percent: bool):
+        self.tree = tree
+        self.variables = variables
+        self.percent = percent
+        self.constant: Optional[Number] = None
+
+    def evaluate(self, env: Dict[str, Fraction]) -> Number:
+        if self.constant is not None:
+            return self.constant
+        return _eval_node(self.tree, env)
+
+
+def parse_value(text: str) -> Optional[ParsedValue]:
+    text = _PERCENT_WORD_RE.sub("%", normalize_answer(text))
+    text = _UNIT_SUFFIX_RE.sub("", text).strip()
+
+    percent = text.endswith("%")
+    if percent:
+        text = text[:-1].strip()
+
+    mixed = re.fullmatch(r"(-?)(\d+) (\d+)/(\d+)", text)
+    if mixed:
+        sign, whole, num, den = mixed.groups()
+        text = f"{sign}({whole} + {num}/{den})"
+
+    parsed = _parse_expression(text)
+    if parsed is None:
+        return None
+
+    value = ParsedValue(*parsed, percent)
+    if not value.variables:
+        try:
+            value.constant = value.evaluate({})
+        except (ValueError, ZeroDivisionError, OverflowError, TypeError, RecursionError):
+            return None
+    return value
+
+
+def _relative_difference(a: Number, b: Number) -> float:
+    if isinstance(a, Fraction) and isinstance(b, Fraction) and a == b:
+        return 0.0
+    a, b = float(a), float(b)
+    scale = max(abs(a), abs(b), 1.0)
+    return abs(a - b) / scale
+
+
+def _compare_scaled(
+    expected: ParsedValue,
+    provided: ParsedValue,
+    tolerance: Optional[float],
+    scale: Fraction
+) -> Optional[bool]:
+    variables = expected.variables | provided.variables
+    points = [
+        {name: point + i for i, name in enumerate(sorted(variables))}
+        for point in _VARIABLE_POINTS
+    ] if variables else [{}]
+
+    try:
+        if tolerance is not None and not variables:
+            difference = abs(float(expected.evaluate({})) - float(provided.evaluate({}) * scale))
+            return difference <= tolerance + 1e-12
+
+        differences = [
+            _relative_difference(expected.evaluate(env), provided.evaluate(env) * scale)
+            for env in points
+        ]
+    except (ValueError, ZeroDivisionError, OverflowError, TypeError, RecursionError):
+        return None
+
+    if all(difference < 1e-9 for difference in differences):
+        return True
+    if any(difference > _WRONG_ANSWER_TOLERANCE for difference in differences):
+        return False
+    return None
+
+
+def compare_values(expected: ParsedValue, provided: ParsedValue, tolerance: Optional[float] = None) -> Optional[bool]:
+    verdict = _compare_scaled(expected, provided, tolerance, Fraction(1))
+    if verdict and expected.percent != provided.percent:
+        # "20" and "20%" only agree if the percent sign is ignored; the question decides which is right.
+        return None
+    if verdict is False and any(
+        _compare_scaled(expected, provided, tolerance, scale)
+        for scale in (Fraction(100), Fraction(1, 100))
+    ):
+        # Off by exactly the factor a percent sign implies ("20" and "0.2", "25%" and "0.25").
+        return None
+    return verdict
+
+
+def _strip_approximate(text: str) -> Tuple[str, bool]:
+    match = _APPROXIMATE_RE.match(text)
+    if match is None:
+        return text, False
+    return text[match.end():], True
+
+
+def _unit_of(text: str) -> Optional[str]:
+    match = _UNIT_SUFFIX_RE.search(text)
+    return match.group(0).strip() if match else None
+
+
+def split_values(text: str) -> Optional[List[ParsedValue]]:
+    text, _ = _strip_approximate(normalize_answer(text))
+    braces = _SET_BRACES_RE.match(text)
+    if braces:
+        text = braces.group(1)
+
+    parts = [part for part in _SET_SEPARATOR_RE.split(text) if part]
+    if not parts or len(parts) > _MAX_SET_SIZE:
+        return None
+
+    expanded = []
+    for part in parts:
+        plus_minus = _PLUS_MINUS_RE.match(part)
+        if plus_minus:
+            center, offset = plus_minus.groups()
+            center = center or "0"
+            expanded.extend((f"{center} + ({offset})", f"{center} - ({offset})"))
+        else:
+            expanded.append(part)
+
+    values = [parse_value(part) for part in expanded]
+    if any(value is None for value in values):
+        return None
+    return values
+
+
+class CanonicalAnswer:
+    __slots__ = ("raw", "kind", "values", "unit", "tolerance", "alternatives", "issue")
+
+    def __init__(
+        self,
+        raw: str,
+        kind: str,
+        values: List[ParsedValue],
+        unit: Optional[str],
+        tolerance: Optional[float],
+        alternatives: frozenset,
+        issue: Optional[str] = None
+    ):
+        self.raw = raw
+        self.kind = kind
+        self.values = values
+        self.unit = unit
+        self.tolerance = tolerance
+        self.alternatives = alternatives
+        self.issue = issue
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "raw": self.raw,
+            "kind": self.kind,
+            "values": [
+                str(value.constant) if value.constant is not None else ast.unparse(value.tree)
+                for value in self.values
+            ],
+            "unit": self.unit,
+            "tolerance": self.tolerance,
+            "alternatives": sorted(self.alternatives),
+            "issue": self.issue
+        }
+
+    def check(self, provided: str) -> Optional[Tuple[bool, str]]:
+        normalized, _ = _strip_approximate(normalize_answer(provided))
+        if normalized in self.alternatives:
+            return True, "exact"
+        if self.kind == "text":
+            return None
+
+        provided_unit = _unit_of(normalized)
+        if self.unit and provided_unit and provided_unit != self.unit:
+            # A different unit may still be a correct conversion; leave it to the LLM.
+            return None
+
+        if self.kind == "set":
+            return self._check_set(normalized)
+
+        value = parse_value(normalized)
+        if value is None:
+            return None
+        expected = self.values[0]
+        verdict = compare_values(expected, value, self.tolerance)
+        if verdict is None:
+            return None
+        return verdict, "symbolic" if expected.variables | value.variables else "numeric"
+
+    def lean(self, provided: str) -> Optional[bool]:
+        # A weak signal for free-text answers the fast path cannot settle: does any
+        # number in the text match the expected value?
+        if self.kind != "number":
+            return None
+        tokens = _NUMBER_TOKEN_RE.findall(normalize_answer(provided))
+        if not tokens or len(tokens) > _MAX_LEAN_TOKENS:
+            return None
+        for token in tokens:
+            value = parse_value(token)
+            if value is not None and compare_values(self.values[0], value, self.tolerance):
+                return True
+        return False
+
+    def _check_set(self, provided: str) -> Optional[Tuple[bool, str]]:
+        values = split_values(provided)
+        if values is None or len(values) != len(self.values):
+            return None
+
+        remaining = list(values)
+        missing = False
+        for expected in self.values:
+            verdicts = [compare_values(expected, value, self.tolerance) for value in remaining]
+            if True in verdicts:
+                remaining.pop(verdicts.index(True))
+            elif all(verdict is False for verdict in verdicts):
+                missing = True
+            else:
+                return None
+        return not missing, "set"
+
+
+def canonicalize(
+    answer: Any,
+    alternatives: Iterable[Any] = (),
+    tolerance: Optional[float] = None
+) -> CanonicalAnswer:
+    raw = str(answer)
+    normalized = normalize_answer(raw)
+    text, approximate = _strip_approximate(normalized)
+
+    if approximate and tolerance is None:
+        decimals = _DECIMALS_RE.search(text)
+        tolerance = 0.5 * 10 ** -len(decimals.group(1)) if decimals else 0.5
+
+    accepted = frozenset({normalized, text, *(normalize_answer(a) for a in alternatives)})
+    values = split_values(text) or []
+
+    if len(values) > 1:
+        kind = "set"
+    elif values:
+        kind = "expression" if values[0].variables else "number"
+    else:
+        return CanonicalAnswer(
+            raw, "text", [], None, tolerance, accepted,
+            issue="Answer is not a number, expression or set of values"
+        )
+
+    return CanonicalAnswer(raw, kind, values, _unit_of(text), tolerance, accepted)
+
+
+def canonicalize_problem(problem: Dict[str, Any]) -> CanonicalAnswer:
+    return canonicalize(
+        problem["answer"],
+        problem.get("accepted_answers", ()),
+        problem.get("tolerance")
+    )
+
+
+def fast_grade(expected: str, provided: str) -> Optional[Tuple[bool, str]]:
+    return canonicalize(expected).check(provided)
+
+
+class AnswerIndex:
+    def __init__(self, max_entries: int = 100000):
+        self.max_entries = max_entries
+        self._answers: Dict[str, CanonicalAnswer] = {}
+        self.flagged: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._answers)
+
+    def add(self, problem: Dict[str, Any]) -> CanonicalAnswer:
+        answer = canonicalize_problem(problem)
+        if len(self._answers) < self.max_entries:
+            self._answers[problem["id"]] = answer
+        if answer.issue:
+            self.flagged[problem["id"]] = answer.issue
+        return answer
+
+    def build(self, problems: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        for problem in problems:
+            self.add(problem)
+        return self.flagged
+
+    def get(self, problem: Dict[str, Any]) -> CanonicalAnswer:
+        answer = self._answers.get(problem["id"])
+        if answer is None or answer.raw != str(problem["answer"]):
+            answer = self.add(problem)
+        return answer
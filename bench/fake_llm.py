@@ -0,0 +1,121 @@
+import json
+import time
+import random
+import asyncio
+import argparse
+import itertools
+from typing import Dict, Any
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import uvicorn
+
+
+def create_app(
+    latency: float = 0.2,
+    jitter: float = 0.1,
+    error_rate: float = 0.0,
+    error_status: int = 429,
+    timeout_rate: float = 0.0,
+    hang: float = 120.0,
+    correct_rate: float = 0.5,
+    confident_rate: float = 0.8,
+    seed: int = 0
+) -> FastAPI:
+    app = FastAPI(title="Fake OpenAI Grader")
+    rng = random.Random(seed)
+    counter = itertools.count()
+    stats: Dict[str, int] = {"requests": 0, "errors": 0, "timeouts": 0}
+    seen_prefixes = set()
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        stats["requests"] += 1
+        roll = rng.random()
+
+        if roll < timeout_rate:
+            stats["timeouts"] += 1
+            await asyncio.sleep(hang)
+
+        await asyncio.sleep(max(latency + rng.uniform(-jitter, jitter), 0.0))
+
+        if roll < timeout_rate + error_rate:
+            stats["errors"] += 1
+            return JSONResponse(
+                {"error": {"message": "Injected upstream error", "type": "fake_error"}},
+                status_code=error_status,
+                headers={"retry-after": "1"} if error_status == 429 else None
+            )
+
+        correct = rng.random() < correct_rate
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len(m.get("content", "")) for m in messages) // 4
+        # Mimic provider prefix caching: a repeated leading message is billed as cached.
+        prefix = messages[0].get("content", "") if messages else ""
+        cached_tokens = len(prefix) // 4 if prefix in seen_prefixes else 0
+        seen_prefixes.add(prefix)
+        content = json.dumps({
+            "s": 100 if correct else 0,
+            "c": correct,
+            "k": 0.95 if rng.random() < confident_rate else 0.5,
+            "f": "Fake grading for benchmarks"
+        })
+
+        return {
+            "id": f"chatcmpl-fake-{next(counter)}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content}
+                }
+            ],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+                "completion_tokens": len(content) // 4,
+                "total_tokens": prompt_tokens + len(content) // 4
+            }
+        }
+
+    @app.get("/stats")
+    async def get_stats() -> Dict[str, Any]:
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI-compatible fake grader for offline benchmarks")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Mean response latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.1, help="Uniform latency jitter in seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=429, help="HTTP status of injected failures")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--hang", type=float, default=120.0, help="Seconds a hanging request waits")
+    parser.add_argument("--correct-rate", type=float, default=0.5, help="Fraction of gradings marked correct")
+    parser.add_argument("--confident-rate", type=float, default=0.8, help="Fraction of gradings with high confidence")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    app = create_app(
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        timeout_rate=args.timeout_rate,
+        hang=args.hang,
+        correct_rate=args.correct_rate,
+        confident_rate=args.confident_rate,
+        seed=args.seed
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, Any, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+import main  # noqa: E402
+
+
+async def call(
+    app,
+    method: str,
+    path: str,
+    body: bytes = b"",
+    headers: Optional[List[Tuple[bytes, bytes]]] = None
+) -> int:
+    # Minimal ASGI round trip, so the numbers reflect the app rather than a client or socket.
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"content-type", b"application/json"), *(headers or [])],
+        "client": ("127.0.0.1", 1),
+        "server": ("127.0.0.1", 8000)
+    }
+    sent = False
+    status = 0
+
+    async def receive() -> Dict[str, Any]:
+        nonlocal sent
+        if sent:
+            await asyncio.sleep(3600)
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message: Dict[str, Any]) -> None:
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(scope, receive, send)
+    return status
+
+
+def a2a(skill_id: str, parameters: Dict[str, Any]) -> bytes:
+    return json.dumps({"skill_id": skill_id, "parameters": parameters, "messages": []}).encode()
+
+
+async def run(iterations: int) -> Dict[str, Dict[str, float]]:
+    etag = main.agent_card_cache.etag
+    cases = {
+        "agent a2a get_math_problem": lambda i: call(
+            main.agent_app, "POST", "/a2a", a2a("get_math_problem", {"session_id": f"micro-{i}"})
+        ),
+        "agent POST /get_problem": lambda i: call(
+            main.agent_app, "POST", "/get_problem", json.dumps({"session_id": f"micro-rest-{i}"}).encode()
+        ),
+        "agent POST /submit_solution (fast path)": lambda i: call(
+            main.agent_app, "POST", "/submit_solution",
+            json.dumps({"session_id": "micro", "problem_id": "1", "solution": "42"}).encode()
+        ),
+        "launcher a2a start_session": lambda i: call(
+            main.launcher_app, "POST", "/a2a", a2a("start_session", {})
+        ),
+        "agent GET /.well-known/agent.json (304)": lambda i: call(
+            main.agent_app, "GET", "/.well-known/agent.json", headers=[(b"if-none-match", etag.encode())]
+        ),
+        "agent GET /health": lambda i: call(main.agent_app, "GET", "/health")
+    }
+
+    results = {}
+    for name, case in cases.items():
+        for i in range(min(200, iterations)):
+            await case(i)
+        started = time.perf_counter()
+        for i in range(iterations):
+            status = await case(i)
+            if status >= 400:
+                raise RuntimeError(f"{name} returned {status}")
+        elapsed = time.perf_counter() - started
+        results[name] = {
+            "us_per_request": round(elapsed / iterations * 1e6, 1),
+            "requests_per_second": round(iterations / elapsed)
+        }
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="In-process per-request cost of the hot endpoints")
+    parser.add_argument("--iterations", type=int, default=5000)
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.iterations))
+
+    print(f"{'request':<42} {'us/req':>9} {'req/s':>9}")
+    for name, r in results.items():
+        print(f"{name:<42} {r['us_per_request']:>9} {r['requests_per_second']:>9}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
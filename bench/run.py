@@ -0,0 +1,245 @@
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, Any, List, Optional
+import httpx
+from scenarios import SCENARIOS, BenchContext, Recorder
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+LAG_RE = re.compile(r"^event_loop_lag_seconds (\S+)$", re.MULTILINE)
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def start_process(args: List[str], env: Dict[str, str]) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, *args],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=None
+    )
+
+
+async def wait_ready(client: httpx.AsyncClient, url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if (await client.get(url)).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.1)
+    raise RuntimeError(f"{url} did not become ready within {timeout}s")
+
+
+async def sample_loop_lag(client: httpx.AsyncClient, urls: Dict[str, str], lags: Dict[str, float], interval: float = 0.5) -> None:
+    while True:
+        for name, url in urls.items():
+            try:
+                match = LAG_RE.search((await client.get(f"{url}/metrics")).text)
+            except httpx.HTTPError:
+                continue
+            if match:
+                lags[name] = max(lags.get(name, 0.0), float(match.group(1)))
+        await asyncio.sleep(interval)
+
+
+async def run_scenario(
+    name: str,
+    ctx: BenchContext,
+    duration: float,
+    concurrency: int,
+    metrics_client: httpx.AsyncClient
+) -> Dict[str, Any]:
+    recorder = Recorder()
+    scenario = SCENARIOS[name]
+    deadline = time.monotonic() + duration
+    lags: Dict[str, float] = {}
+
+    async def worker() -> None:
+        while time.monotonic() < deadline:
+            await scenario(ctx, recorder)
+
+    sampler = asyncio.create_task(sample_loop_lag(
+        metrics_client, {"agent": ctx.agent_url, "launcher": ctx.launcher_url}, lags
+    ))
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+
+    requests = {}
+    for label, latencies in sorted(recorder.latencies.items()):
+        requests[label] = {
+            "count": len(latencies),
+            "errors": recorder.errors.get(label, 0),
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 2)
+        }
+
+    total = sum(r["count"] for r in requests.values())
+    return {
+        "duration": round(elapsed, 2),
+        "concurrency": concurrency,
+        "requests_total": total,
+        "errors_total": sum(r["errors"] for r in requests.values()),
+        "rps": round(total / elapsed, 1),
+        "event_loop_lag_max_ms": {name: round(lag * 1000, 2) for name, lag in sorted(lags.items())},
+        "requests": requests
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    header = f"{'request':<42} {'count':>7} {'err':>5} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    for name, result in report["scenarios"].items():
+        lag = ", ".join(f"{app} {ms} ms" for app, ms in result["event_loop_lag_max_ms"].items()) or "n/a"
+        print(f"\n== {name}: {result['rps']} req/s, {result['errors_total']} errors, "
+              f"concurrency {result['concurrency']}, max loop lag: {lag}")
+        print(header)
+        for label, r in result["requests"].items():
+            print(f"{label:<42} {r['count']:>7} {r['errors']:>5} {r['rps']:>8} "
+                  f"{r['p50_ms']:>9} {r['p95_ms']:>9} {r['p99_ms']:>9}")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    regressions = []
+    for name, result in report["scenarios"].items():
+        before = baseline.get("scenarios", {}).get(name)
+        if before is None:
+            continue
+        if result["rps"] < before["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['rps']} req/s vs baseline {before['rps']}")
+        for label, r in result["requests"].items():
+            previous = before["requests"].get(label)
+            if previous and r["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+                regressions.append(f"{name} / {label}: p95 {r['p95_ms']} ms vs baseline {previous['p95_ms']} ms")
+    return regressions
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    with open(os.path.join(ROOT, args.problems)) as f:
+        problems = json.load(f)["problems"]
+
+    limits = httpx.Limits(max_connections=args.concurrency * 2, max_keepalive_connections=args.concurrency * 2)
+    async with httpx.AsyncClient(limits=limits, timeout=args.request_timeout) as client, \
+            httpx.AsyncClient(timeout=5) as metrics_client:
+        await wait_ready(metrics_client, f"{args.agent_url}/health")
+        await wait_ready(metrics_client, f"{args.launcher_url}/health")
+
+        ctx = BenchContext(args.agent_url, args.launcher_url, client, problems, seed=args.seed)
+        report = {"config": {k: v for k, v in vars(args).items() if k not in ("baseline", "output")}, "scenarios": {}}
+        for name in args.scenarios.split(","):
+            print(f"Running {name} for {args.duration}s at concurrency {args.concurrency}...", file=sys.stderr)
+            report["scenarios"][name] = await run_scenario(name, ctx, args.duration, args.concurrency, metrics_client)
+        return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the agent and launcher apps")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per scenario")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent virtual clients")
+    parser.add_argument("--request-timeout", type=float, default=60)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--problems", default="math_problems.json", help="Problem file used by the servers")
+    parser.add_argument("--agent-port", type=int, default=18000)
+    parser.add_argument("--launcher-port", type=int, default=18001)
+    parser.add_argument("--llm-port", type=int, default=19100)
+    parser.add_argument("--llm-latency", type=float, default=0.2)
+    parser.add_argument("--llm-jitter", type=float, default=0.1)
+    parser.add_argument("--llm-error-rate", type=float, default=0.0)
+    parser.add_argument("--llm-error-status", type=int, default=429)
+    parser.add_argument("--llm-timeout-rate", type=float, default=0.0)
+    parser.add_argument("--llm-confident-rate", type=float, default=0.8)
+    parser.add_argument("--external", action="store_true", help="Benchmark servers that are already running")
+    parser.add_argument("--agent-url", default=None)
+    parser.add_argument("--launcher-url", default=None)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    parser.add_argument("--baseline", help="Compare against a previous JSON report and fail on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression as a fraction")
+    args = parser.parse_args()
+
+    unknown = set(args.scenarios.split(",")) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    args.agent_url = args.agent_url or f"http://127.0.0.1:{args.agent_port}"
+    args.launcher_url = args.launcher_url or f"http://127.0.0.1:{args.launcher_port}"
+
+    processes: List[subprocess.Popen] = []
+    workdir: Optional[tempfile.TemporaryDirectory] = None
+
+    if not args.external:
+        workdir = tempfile.TemporaryDirectory(prefix="bench-")
+        env = dict(
+            os.environ,
+            OPENAI_API_KEY="bench",
+            OPENAI_BASE_URL=f"http://127.0.0.1:{args.llm_port}/v1",
+            PROBLEM_BANK_PATH=args.problems,
+            SESSION_STORE="sqlite",
+            SESSION_STORE_PATH=os.path.join(workdir.name, "sessions.db"),
+            AGENT_URL=args.agent_url,
+            LAUNCHER_URL=args.launcher_url
+        )
+        processes.append(start_process([
+            os.path.join("bench", "fake_llm.py"),
+            "--port", str(args.llm_port),
+            "--latency", str(args.llm_latency),
+            "--jitter", str(args.llm_jitter),
+            "--error-rate", str(args.llm_error_rate),
+            "--error-status", str(args.llm_error_status),
+            "--timeout-rate", str(args.llm_timeout_rate),
+            "--confident-rate", str(args.llm_confident_rate),
+            "--seed", str(args.seed)
+        ], env))
+        for app, port in (("main:agent_app", args.agent_port), ("main:launcher_app", args.launcher_port)):
+            processes.append(start_process([
+                "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"
+            ], env))
+
+    try:
+        report = asyncio.run(run(args))
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        if workdir is not None:
+            workdir.cleanup()
+
+    print_report(report)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions against baseline:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print("\nNo regressions against baseline.")
+
+
+if __name__ == "__main__":
+    main()
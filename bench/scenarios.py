@@ -0,0 +1,167 @@
+import time
+import uuid
+import random
+from typing import Dict, Any, List, Optional, Callable, Awaitable
+import httpx
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.errors: Dict[str, int] = {}
+
+    async def request(
+        self,
+        label: str,
+        client: httpx.AsyncClient,
+        method: str,
+        url: str,
+        expected: tuple = (200,),
+        **kwargs: Any
+    ) -> Optional[httpx.Response]:
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            response = None
+        elapsed = time.perf_counter() - started
+
+        self.latencies.setdefault(label, []).append(elapsed)
+        failed = response is None or response.status_code not in expected
+        if not failed and url.endswith("/a2a"):
+            failed = response.json().get("status") == "failed"
+        if failed:
+            self.errors[label] = self.errors.get(label, 0) + 1
+            return None
+        return response
+
+
+class BenchContext:
+    def __init__(
+        self,
+        agent_url: str,
+        launcher_url: str,
+        client: httpx.AsyncClient,
+        problems: List[Dict[str, Any]],
+        seed: int = 0
+    ):
+        self.agent_url = agent_url
+        self.launcher_url = launcher_url
+        self.client = client
+        self.problems = problems
+        self.answers = {p["id"]: p["answer"] for p in problems}
+        self.rng = random.Random(seed)
+        self.card_etags: Dict[str, str] = {}
+
+    def answer_for(self, problem_id: str) -> str:
+        # A mix of answers settled by the local fast path and free text that needs the LLM.
+        roll = self.rng.random()
+        if roll < 0.4:
+            return self.answers[problem_id]
+        if roll < 0.6:
+            return "0"
+        return f"I worked it out and got {self.answers[problem_id]} (attempt {uuid.uuid4().hex[:8]})"
+
+
+def a2a_body(skill_id: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "task_id": str(uuid.uuid4()),
+        "skill_id": skill_id,
+        "parameters": parameters,
+        "messages": []
+    }
+
+
+async def session_lifecycle(ctx: BenchContext, recorder: Recorder, problems_per_session: int = 3) -> None:
+    response = await recorder.request(
+        "launcher a2a start_session", ctx.client, "POST", f"{ctx.launcher_url}/a2a",
+        json=a2a_body("start_session", {})
+    )
+    if response is None:
+        return
+    session_id = response.json()["result"]["session_id"]
+
+    for _ in range(problems_per_session):
+        response = await recorder.request(
+            "agent a2a get_math_problem", ctx.client, "POST", f"{ctx.agent_url}/a2a",
+            json=a2a_body("get_math_problem", {"session_id": session_id})
+        )
+        if response is None:
+            return
+        problem_id = response.json()["result"].get("problem_id")
+        if problem_id is None:
+            break
+
+        await recorder.request(
+            "agent a2a evaluate_solution", ctx.client, "POST", f"{ctx.agent_url}/a2a",
+            json=a2a_body("evaluate_solution", {
+                "session_id": session_id,
+                "problem_id": problem_id,
+                "solution": ctx.answer_for(problem_id)
+            })
+        )
+
+    await recorder.request(
+        "launcher a2a get_session_status", ctx.client, "POST", f"{ctx.launcher_url}/a2a",
+        json=a2a_body("get_session_status", {"session_id": session_id})
+    )
+
+
+async def rest_session(ctx: BenchContext, recorder: Recorder) -> None:
+    response = await recorder.request(
+        "launcher POST /start_session", ctx.client, "POST", f"{ctx.launcher_url}/start_session"
+    )
+    if response is None:
+        return
+    session_id = response.json()["session_id"]
+
+    response = await recorder.request(
+        "agent POST /get_problem", ctx.client, "POST", f"{ctx.agent_url}/get_problem",
+        json={"session_id": session_id}
+    )
+    if response is None:
+        return
+    problem_id = response.json()["problem_id"]
+
+    await recorder.request(
+        "agent POST /submit_solution", ctx.client, "POST", f"{ctx.agent_url}/submit_solution",
+        json={"session_id": session_id, "problem_id": problem_id, "solution": ctx.answer_for(problem_id)}
+    )
+
+
+async def eval_burst(ctx: BenchContext, recorder: Recorder, batch_size: int = 20) -> None:
+    problem = ctx.rng.choice(ctx.problems)
+    await recorder.request(
+        "agent POST /submit_solution", ctx.client, "POST", f"{ctx.agent_url}/submit_solution",
+        json={"session_id": "bench", "problem_id": problem["id"], "solution": ctx.answer_for(problem["id"])}
+    )
+
+    if ctx.rng.random() < 0.1:
+        items = []
+        for _ in range(batch_size):
+            problem = ctx.rng.choice(ctx.problems)
+            items.append({"problem_id": problem["id"], "solution": ctx.answer_for(problem["id"])})
+        await recorder.request(
+            "agent POST /submit_solutions_batch", ctx.client, "POST", f"{ctx.agent_url}/submit_solutions_batch",
+            json={"session_id": "bench", "items": items}
+        )
+
+
+async def card_polling(ctx: BenchContext, recorder: Recorder) -> None:
+    for name, base_url in (("agent", ctx.agent_url), ("launcher", ctx.launcher_url)):
+        etag = ctx.card_etags.get(name)
+        headers = {"If-None-Match": etag} if etag else {}
+        response = await recorder.request(
+            f"{name} GET /.well-known/agent.json", ctx.client, "GET", f"{base_url}/.well-known/agent.json",
+            expected=(200, 304), headers=headers
+        )
+        if response is not None and "etag" in response.headers:
+            ctx.card_etags[name] = response.headers["etag"]
+
+
+SCENARIOS: Dict[str, Callable[[BenchContext, Recorder], Awaitable[None]]] = {
+    "session_lifecycle": session_lifecycle,
+    "rest_session": rest_session,
+    "eval_burst": eval_burst,
+    "card_polling": card_polling
+}
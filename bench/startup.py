@@ -0,0 +1,148 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Dict, Any, List, Tuple
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_TIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+# The first request each app serves that needs more than the module itself:
+# a fast-path grading builds the evaluator, a session loads the problem bank.
+FIRST_REQUESTS = {
+    "agent": ("main:agent_app", "/submit_solution", {"session_id": "startup", "problem_id": "1", "solution": "42"}),
+    "launcher": ("main:launcher_app", "/start_session", None)
+}
+
+
+def measure_import(env: Dict[str, str]) -> Tuple[float, Dict[str, float]]:
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    total = 0.0
+    direct: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_TIME_RE.match(line)
+        if match is None:
+            continue
+        cumulative = int(match.group(2)) / 1000
+        if match.group(4) == "main":
+            total = cumulative
+        elif len(match.group(3)) == 3:
+            direct[match.group(4)] = cumulative
+    return total, direct
+
+
+def measure_app(name: str, port: int, env: Dict[str, str], timeout: float) -> Dict[str, float]:
+    app, path, body = FIRST_REQUESTS[name]
+    url = f"http://127.0.0.1:{port}"
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            deadline = started + timeout
+            while True:
+                try:
+                    if client.get(f"{url}/health").status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.perf_counter() > deadline or process.poll() is not None:
+                    raise RuntimeError(f"{app} did not become ready within {timeout}s")
+                time.sleep(0.005)
+            ready = time.perf_counter()
+
+            client.post(f"{url}{path}", json=body).raise_for_status()
+            first = time.perf_counter() - ready
+
+            second_started = time.perf_counter()
+            client.post(f"{url}{path}", json=body)
+            second = time.perf_counter() - second_started
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+    return {
+        "ready_ms": (ready - started) * 1000,
+        "first_request_ms": first * 1000,
+        "second_request_ms": second * 1000
+    }
+
+
+def median_of(samples: List[Dict[str, float]]) -> Dict[str, float]:
+    return {key: round(statistics.median(sample[key] for sample in samples), 1) for key in samples[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cold start time of the agent and launcher apps")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement; medians are reported")
+    parser.add_argument("--apps", default="agent,launcher", help="Comma-separated apps to start")
+    parser.add_argument("--port", type=int, default=18500)
+    parser.add_argument("--problems", default="math_problems.json", help="Problem file used by the servers")
+    parser.add_argument("--warmup", action="store_true", help="Start the apps with WARMUP=true")
+    parser.add_argument("--timeout", type=float, default=60)
+    parser.add_argument("--top", type=int, default=10, help="Slowest direct imports of main to list")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    env = dict(
+        os.environ,
+        OPENAI_API_KEY=os.getenv("OPENAI_API_KEY", "bench"),
+        # Nothing here reaches the grader; a closed port keeps a misrouted call from leaving the machine.
+        OPENAI_BASE_URL="http://127.0.0.1:9/v1",
+        PROBLEM_BANK_PATH=args.problems,
+        WARMUP="true" if args.warmup else "false"
+    )
+
+    imports = [measure_import(env) for _ in range(args.runs)]
+    report: Dict[str, Any] = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "import_main_ms": round(statistics.median(total for total, _ in imports), 1),
+        "slowest_imports_ms": dict(sorted(
+            ((module, round(statistics.median(top.get(module, 0.0) for _, top in imports), 1))
+             for module in imports[0][1]),
+            key=lambda item: -item[1]
+        )[:args.top]),
+        "apps": {}
+    }
+
+    for name in args.apps.split(","):
+        samples = [measure_app(name, args.port, env, args.timeout) for _ in range(args.runs)]
+        report["apps"][name] = median_of(samples)
+
+    print(f"import main: {report['import_main_ms']:.1f} ms")
+    for module, elapsed in report["slowest_imports_ms"].items():
+        print(f"  {module:<30} {elapsed:8.1f} ms")
+    print(f"\n{'app':<10} {'ready':>10} {'1st request':>12} {'2nd request':>12}")
+    for name, result in report["apps"].items():
+        print(
+            f"{name:<10} {result['ready_ms']:>8.1f}ms {result['first_request_ms']:>10.1f}ms "
+            f"{result['second_request_ms']:>10.1f}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
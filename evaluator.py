@@ -1,100 +1,325 @@
 import os
-from typing import Dict, Any
-from openai import OpenAI
+import json
+import asyncio
+from contextlib import nullcontext
+from typing import Dict, Any, List, Optional, Iterable, Callable, AsyncContextManager
+import openai
 from dotenv import load_dotenv
+from grading_cache import GradingCache
+from upstream import UpstreamClient, UpstreamUnavailableError, token_usage
+from metrics import gradings, gradings_in_flight, grading_escalations, grading_truncations
+from answers import AnswerIndex, CanonicalAnswer, canonicalize, normalize_answer, fast_grade
+from tracing import span
 
 load_dotenv()
 
+PROMPT_VERSION = "3"
+
+# Fixed instructions go first and never change, so the provider can cache this prefix
+# across every grading; the per-problem segment and the student answer follow it.
+SYSTEM_PROMPT = """You are a precise math evaluator grading a student's answer to a math problem.
+The user message gives the problem, the expected answer, optionally an explanation, and then the student's answer.
+
+Grade the student's answer:
+- Accept different valid approaches and equivalent forms (e.g. 0.5 vs 1/2, 50% vs 0.5 where the problem allows it).
+- Accept reasonable rounding and missing or different but equivalent units.
+- Give partial credit only for partially correct answers.
+
+Respond with JSON only, no other text:
+{"s": <score 0-100>, "c": <true if the answer is correct, else false>, "k": <confidence in your grade, 0-1>, "f": "<feedback, at most 20 words>"}"""
+
+DEFAULT_TOKEN_BUDGETS = "easy=500,medium=750,hard=1000"
+DEFAULT_TOKEN_BUDGET = 1000
+DEFAULT_RETRY_TOKEN_BUDGET = 4000
+DEFAULT_CASCADE_THRESHOLDS = "easy=0.7,medium=0.8,hard=0.9"
+DEFAULT_CASCADE_THRESHOLD = 0.9
+
+_MAX_SEGMENTS = 100000
+
+
+def parse_difficulty_map(spec: str, cast: Callable[[str], Any] = int) -> Dict[str, Any]:
+    values = {}
+    for entry in spec.split(","):
+        if "=" in entry:
+            difficulty, value = entry.split("=", 1)
+            values[difficulty.strip()] = cast(value)
+    return values
+
+
+def combine_usage(*usages: Optional[Dict[str, int]]) -> Optional[Dict[str, int]]:
+    present = [usage for usage in usages if usage]
+    if not present:
+        return None
+    return {key: sum(usage.get(key, 0) for usage in present) for key in present[0]}
+
+
+def finish_reason(response: Any) -> Optional[str]:
+    choices = getattr(response, "choices", None)
+    return getattr(choices[0], "finish_reason", None) if choices else None
+
+
+def build_problem_segment(problem: str, expected_answer: str, explanation: str = "") -> str:
+    segment = f"Problem: {problem}\nExpected answer: {expected_answer}\n"
+    if explanation:
+        segment += f"Explanation: {explanation}\n"
+    return segment
+
 
 class MathEvaluator:
-    def __init__(self):
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-        self.model = "gpt-5"
-    
-    def evaluate_solution(
+    def __init__(
+        self,
+        max_concurrency: Optional[int] = None,
+        timeout: Optional[float] = None,
+        cache: Optional[GradingCache] = None,
+        upstream: Optional[UpstreamClient] = None
+    ):
+        api_key = os.getenv("OPENAI_API_KEY")
+        self.upstream = upstream or UpstreamClient.from_env(api_key)
+        self.model = os.getenv("GRADING_LARGE_MODEL", "gpt-5")
+        self.prompt_version = PROMPT_VERSION
+        # The small model grades first; an empty GRADING_SMALL_MODEL sends everything to the large one.
+        self.small_model = os.getenv("GRADING_SMALL_MODEL", "gpt-5-mini") or None
+        self.max_concurrency = max_concurrency or int(os.getenv("EVALUATOR_MAX_CONCURRENCY", "256"))
+        self.timeout = timeout or float(os.getenv("EVALUATOR_TIMEOUT", "60"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.cache = cache or GradingCache.from_env()
+        self.token_budgets = parse_difficulty_map(os.getenv("GRADING_TOKEN_BUDGETS", DEFAULT_TOKEN_BUDGETS))
+        self.retry_token_budget = int(os.getenv("GRADING_RETRY_TOKEN_BUDGET", str(DEFAULT_RETRY_TOKEN_BUDGET)))
+        self.cascade_thresholds = parse_difficulty_map(
+            os.getenv("GRADING_CASCADE_THRESHOLDS", DEFAULT_CASCADE_THRESHOLDS), float
+        )
+        self._segments: Dict[str, str] = {}
+        self.answers = AnswerIndex(_MAX_SEGMENTS)
+
+    def prepare_problems(self, problems: Iterable[Dict[str, Any]]) -> Dict[str, str]:
+        for p in problems:
+            self._segments[p["id"]] = build_problem_segment(p["problem"], p["answer"], p.get("explanation", ""))
+            self.answers.add(p)
+        return self.answers.flagged
+
+    def canonical_answer(self, problem: Dict[str, Any]) -> CanonicalAnswer:
+        return self.answers.get(problem)
+
+    def problem_segment(
+        self,
+        problem: str,
+        expected_answer: str,
+        explanation: str = "",
+        problem_id: Optional[str] = None
+    ) -> str:
+        if problem_id is None:
+            return build_problem_segment(problem, expected_answer, explanation)
+        segment = self._segments.get(problem_id)
+        if segment is None:
+            segment = build_problem_segment(problem, expected_answer, explanation)
+            if len(self._segments) < _MAX_SEGMENTS:
+                self._segments[problem_id] = segment
+        return segment
+
+    def token_budget(self, difficulty: Optional[str] = None) -> int:
+        return self.token_budgets.get(difficulty or "", DEFAULT_TOKEN_BUDGET)
+
+    def cascade_threshold(self, difficulty: Optional[str] = None) -> float:
+        return self.cascade_thresholds.get(difficulty or "", DEFAULT_CASCADE_THRESHOLD)
+
+    def cascade_signature(self, difficulty: Optional[str] = None) -> str:
+        # Part of the grading cache key, so changing models or thresholds never serves stale grades.
+        if self.small_model is None:
+            return self.model
+        return f"{self.small_model}>{self.model}@{self.cascade_threshold(difficulty)}"
+
+    def _build_messages(
+        self,
+        problem: str,
+        expected_answer: str,
+        agent_solution: str,
+        explanation: str = "",
+        problem_id: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        segment = self.problem_segment(problem, expected_answer, explanation, problem_id)
+
+        return [
+            {
+                "role": "system",
+                "content": SYSTEM_PROMPT
+            },
+            {
+                "role": "user",
+                "content": f"{segment}Student answer: {agent_solution}"
+            }
+        ]
+
+    def _parse_response(self, response: Any, model: Optional[str] = None) -> Dict[str, Any]:
+        result = json.loads(response.choices[0].message.content)
+
+        return {
+            "score": result.get("s", result.get("score", 0)),
+            "correct": result.get("c", result.get("correct", False)),
+            "confidence": float(result.get("k", result.get("confidence", 0))),
+            "feedback": result.get("f", result.get("feedback", "No feedback provided")),
+            "model": model or self.model,
+            "usage": token_usage(response)
+        }
+
+    async def aevaluate_solution(
         self,
         problem: str,
         expected_answer: str,
         agent_solution: str,
-        explanation: str = ""
+        explanation: str = "",
+        timeout: Optional[float] = None,
+        problem_id: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        model: Optional[str] = None
     ) -> Dict[str, Any]:
-        evaluation_prompt = f"""You are a math evaluator. Your task is to grade a student's solution to a math problem.
+        timeout = timeout or self.timeout
+        model = model or self.model
 
-Problem: {problem}
-Expected Answer: {expected_answer}
-{f"Explanation: {explanation}" if explanation else ""}
+        with span("grade.prompt"):
+            messages = self._build_messages(problem, expected_answer, agent_solution, explanation, problem_id)
 
-Student's Solution: {agent_solution}
+        # Upstream failures raise UpstreamUnavailableError instead of producing a
+        # score of 0, so infrastructure problems never show up as wrong answers.
+        budget = self.token_budget(difficulty)
+        truncated = None
+        try:
+            response = await self._complete(model, messages, timeout, budget)
+            if finish_reason(response) == "length" and budget < self.retry_token_budget:
+                # Reasoning models can spend the whole budget thinking and return no content;
+                # retry once with room to finish instead of failing the grading.
+                grading_truncations.inc(model)
+                truncated = response
+                response = await self._complete(model, messages, timeout, self.retry_token_budget)
+        except openai.OpenAIError as e:
+            raise UpstreamUnavailableError(f"Upstream request failed: {str(e)}")
 
-Evaluate the student's solution and provide:
-1. A score from 0-100
-2. Brief feedback on correctness
-3. Whether the answer is correct (even if expressed differently)
+        try:
+            with span("llm.decode"):
+                result = self._parse_response(response, model)
+        except (ValueError, TypeError, AttributeError, IndexError) as e:
+            raise UpstreamUnavailableError(f"Invalid grader response: {str(e)}")
+        if truncated is not None:
+            result["usage"] = combine_usage(token_usage(truncated), result["usage"])
+        return result
 
-Consider:
-- Different valid approaches to the same answer
-- Equivalent forms (e.g., 0.5 vs 1/2)
-- Reasonable rounding
-- Units and formatting
+    async def _complete(self, model: str, messages: List[Dict[str, str]], timeout: float, budget: int) -> Any:
+        with span("grade.slot"):
+            await self._semaphore.acquire()
+        try:
+            with span(f"llm.{model}"):
+                return await self.upstream.chat_completion(
+                    timeout=timeout,
+                    model=model,
+                    messages=messages,
+                    max_completion_tokens=budget,
+                    response_format={"type": "json_object"}
+                )
+        finally:
+            self._semaphore.release()
 
-Respond in JSON format:
-{{
-  "score": <0-100>,
-  "correct": <true/false>,
-  "feedback": "<brief feedback>"
-}}"""
+    async def _cascade(self, lean: Optional[bool], **kwargs: Any) -> Dict[str, Any]:
+        if self.small_model is None:
+            result = await self.aevaluate_solution(**kwargs)
+            result["tier"] = "llm"
+            return result
 
+        small = None
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a precise math evaluator. Always respond with valid JSON."
-                    },
-                    {
-                        "role": "user",
-                        "content": evaluation_prompt
-                    }
-                ],
-                max_completion_tokens=500,
-                response_format={"type": "json_object"}
-            )
-            
-            import json
-            result = json.loads(response.choices[0].message.content)
-            
-            return {
-                "score": result.get("score", 0),
-                "correct": result.get("correct", False),
-                "feedback": result.get("feedback", "No feedback provided"),
-                "model": self.model
-            }
-            
-        except Exception as e:
+            small = await self.aevaluate_solution(model=self.small_model, **kwargs)
+        except UpstreamUnavailableError:
+            reason = "small_error"
+        else:
+            if small["confidence"] < self.cascade_threshold(kwargs.get("difficulty")):
+                reason = "low_confidence"
+            elif lean is not None and bool(small["correct"]) != lean:
+                reason = "disagreement"
+            else:
+                small["tier"] = "llm-small"
+                return small
+
+        grading_escalations.inc(reason)
+        result = await self.aevaluate_solution(**kwargs)
+        result["tier"] = "llm-large"
+        result["escalation"] = reason
+        if small is not None:
+            result["usage"] = combine_usage(small["usage"], result["usage"])
+        return result
+
+    async def grade(
+        self,
+        problem: str,
+        expected_answer: str,
+        agent_solution: str,
+        explanation: str = "",
+        timeout: Optional[float] = None,
+        problem_id: Optional[str] = None,
+        difficulty: Optional[str] = None,
+        canonical: Optional[CanonicalAnswer] = None,
+        admit: Optional[Callable[[], AsyncContextManager[None]]] = None
+    ) -> Dict[str, Any]:
+        with span("grade.fast_path"):
+            canonical = canonical or canonicalize(expected_answer)
+            verdict = canonical.check(agent_solution)
+
+        if verdict is not None:
+            correct, tier = verdict
+            gradings.inc(tier)
             return {
-                "score": 0,
-                "correct": False,
-                "feedback": f"Error evaluating solution: {str(e)}",
-                "model": self.model
+                "score": 100 if correct else 0,
+                "correct": correct,
+                "feedback": (
+                    "Answer is equivalent to the expected answer"
+                    if correct else
+                    "Answer does not match the expected answer"
+                ),
+                "model": None,
+                "tier": tier,
+                "usage": None
             }
-    
+
+        async def evaluate() -> Dict[str, Any]:
+            # Only model calls wait for admission; answers settled locally or by the cache
+            # never queue behind them.
+            async with admit() if admit else nullcontext():
+                gradings_in_flight.inc()
+                try:
+                    return await self._cascade(
+                        canonical.lean(agent_solution),
+                        problem=problem,
+                        expected_answer=expected_answer,
+                        agent_solution=agent_solution,
+                        explanation=explanation,
+                        timeout=timeout,
+                        problem_id=problem_id,
+                        difficulty=difficulty
+                    )
+                finally:
+                    gradings_in_flight.dec()
+
+        if problem_id is None:
+            result = await evaluate()
+            gradings.inc(result["tier"])
+            return result
+
+        key = GradingCache.make_key(
+            problem_id, normalize_answer(agent_solution), self.cascade_signature(difficulty), PROMPT_VERSION
+        )
+        result, cached = await self.cache.get_or_compute(key, evaluate)
+        result["cached"] = cached
+        if cached:
+            # The tokens were spent by the call that produced the cached grading.
+            result["usage"] = None
+        gradings.inc("cached" if cached else result["tier"])
+        return result
+
     def quick_check(self, expected: str, provided: str) -> bool:
         try:
-            expected_clean = expected.strip().lower().replace(" ", "")
-            provided_clean = provided.strip().lower().replace(" ", "")
-            
-            if expected_clean == provided_clean:
-                return True
-            
-            try:
-                expected_num = float(expected_clean)
-                provided_num = float(provided_clean)
-                return abs(expected_num - provided_num) < 0.01
-            except (ValueError, TypeError):
-                pass
-            
-            return False
+            verdict = fast_grade(expected, provided)
+            if verdict is not None:
+                return verdict[0]
+
+            expected_num = float(normalize_answer(expected).replace(" ", ""))
+            provided_num = float(normalize_answer(provided).replace(" ", ""))
+            return abs(expected_num - provided_num) < 0.01
         except Exception:
             return False
-
@@ -0,0 +1,184 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+
+
+def _retrieve_exception(task: asyncio.Future) -> None:
+    # Every waiter may have been cancelled; mark the failure as seen so it is not logged as lost.
+    if not task.cancelled():
+        task.exception()
+
+
+class GradingCache:
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl: float = 86400,
+        path: Optional[str] = None
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+        self.disk_hits = 0
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS grades ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM grades WHERE expires_at <= ?", (time.time(),))
+
+    @classmethod
+    def from_env(cls) -> "GradingCache":
+        return cls(
+            max_entries=int(os.getenv("GRADING_CACHE_SIZE", "10000")),
+            ttl=float(os.getenv("GRADING_CACHE_TTL", "86400")),
+            path=os.getenv("GRADING_CACHE_PATH") or None
+        )
+
+    @staticmethod
+    def make_key(problem_id: str, answer: str, model: str, prompt_version: str) -> str:
+        payload = json.dumps([problem_id, answer, model, prompt_version], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _get_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at > now:
+            self._entries.move_to_end(key)
+            return value
+        del self._entries[key]
+        self.evictions += 1
+        return None
+
+    def _load(self, key: str, now: float) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT value, expires_at FROM grades WHERE key = ? AND expires_at > ?",
+                (key, now)
+            ).fetchone()
+        return (json.loads(row[0]), row[1]) if row is not None else None
+
+    def _save(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO grades (key, value, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), expires_at)
+            )
+
+    def _found(self, key: str, loaded: Optional[Tuple[Dict[str, Any], float]]) -> Optional[Dict[str, Any]]:
+        if loaded is None:
+            self.misses += 1
+            return None
+        value, expires_at = loaded
+        self._store(key, value, expires_at)
+        self.hits += 1
+        self.disk_hits += 1
+        return dict(value)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            self.hits += 1
+            return dict(value)
+        return self._found(key, self._load(key, now) if self._db is not None else None)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        self._store(key, value, expires_at)
+        if self._db is not None:
+            self._save(key, value, expires_at)
+
+    def _store(self, key: str, value: Dict[str, Any], expires_at: float) -> None:
+        self._entries[key] = (expires_at, dict(value))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        cacheable: Callable[[Dict[str, Any]], bool] = lambda value: True
+    ) -> Tuple[Dict[str, Any], bool]:
+        value = self._get_memory(key, time.time())
+        if value is not None:
+            self.hits += 1
+            return dict(value), True
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            value, _ = await asyncio.shield(inflight)
+            return dict(value), True
+
+        # The lookup and grading run in their own task, so a caller that is cancelled (a dropped
+        # stream, a timed-out request) only stops waiting; everyone coalesced onto it still gets
+        # the grade.
+        task = asyncio.ensure_future(self._compute(key, compute, cacheable))
+        task.add_done_callback(_retrieve_exception)
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _compute(
+        self,
+        key: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        cacheable: Callable[[Dict[str, Any]], bool]
+    ) -> Tuple[Dict[str, Any], bool]:
+        try:
+            if self._db is not None:
+                # Other workers may hold the write lock; wait for it in a thread, not on the loop.
+                stored = self._found(key, await asyncio.to_thread(self._load, key, time.time()))
+                if stored is not None:
+                    return stored, True
+            else:
+                self.misses += 1
+
+            value = await compute()
+            if cacheable(value):
+                expires_at = time.time() + self.ttl
+                self._store(key, value, expires_at)
+                if self._db is not None:
+                    await asyncio.to_thread(self._save, key, value, expires_at)
+            return value, False
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "coalesced": self.coalesced,
+            "inflight": len(self._inflight),
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable
+
+
+class IdempotencyConflict(Exception):
+    pass
+
+
+def fingerprint(*parts: Any) -> str:
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def _retrieve_exception(task: asyncio.Future) -> None:
+    # Every waiter may have been cancelled; mark the failure as seen so it is not logged as lost.
+    if not task.cancelled():
+        task.exception()
+
+
+class IdempotencyStore:
+    def __init__(self, max_entries: int = 10000, ttl: float = 3600):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self.replayed = 0
+        self.attached = 0
+        self.evictions = 0
+
+    @classmethod
+    def from_env(cls) -> "IdempotencyStore":
+        return cls(
+            max_entries=int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000")),
+            ttl=float(os.getenv("IDEMPOTENCY_TTL", "3600"))
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _lookup(self, key: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, stored_fingerprint, response = entry
+        if expires_at <= time.time():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return stored_fingerprint, response
+
+    def _store(self, key: str, request_fingerprint: str, response: Dict[str, Any]) -> None:
+        self._entries[key] = (time.time() + self.ttl, request_fingerprint, response)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def run(
+        self,
+        key: str,
+        request_fingerprint: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        storable: Callable[[Dict[str, Any]], bool] = lambda response: True,
+        strict: bool = True
+    ) -> Tuple[Dict[str, Any], bool]:
+        # A strict key was chosen by the client for this one request, so reusing it with other
+        # parameters is an error; a lenient one (a reused task_id) just starts a new request.
+        stored = self._lookup(key)
+        if stored is not None:
+            if stored[0] == request_fingerprint:
+                self.replayed += 1
+                return stored[1], True
+            if strict:
+                raise IdempotencyConflict("Idempotency key was already used with different parameters")
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            if inflight[0] == request_fingerprint:
+                self.attached += 1
+                return await asyncio.shield(inflight[1]), True
+            if strict:
+                raise IdempotencyConflict("Idempotency key is in use by a request with different parameters")
+            return await compute(), False
+
+        # The request runs in its own task, so a cancelled caller only stops waiting; requests
+        # attached to the same key still get the response.
+        task = asyncio.ensure_future(self._compute(key, request_fingerprint, compute, storable))
+        task.add_done_callback(_retrieve_exception)
+        self._inflight[key] = (request_fingerprint, task)
+        return await asyncio.shield(task), False
+
+    async def _compute(
+        self,
+        key: str,
+        request_fingerprint: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+        storable: Callable[[Dict[str, Any]], bool]
+    ) -> Dict[str, Any]:
+        try:
+            response = await compute()
+            # Only final outcomes are replayed; a transient failure is retried for real.
+            if storable(response):
+                self._store(key, request_fingerprint, response)
+            return response
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "inflight": len(self._inflight),
+            "replayed": self.replayed,
+            "attached": self.attached,
+            "evictions": self.evictions
+        }
@@ -0,0 +1,77 @@
+import os
+import asyncio
+import contextvars
+from typing import Dict, Any, List, Optional
+from serialization import dumps
+
+
+class JsonlWriter:
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        flush_interval: float = 1.0,
+        max_pending: int = 100000
+    ):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending: List[bytes] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._flusher: Optional[asyncio.Task] = None
+        self.written = 0
+        self.dropped = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def record(self, entry: Dict[str, Any]) -> None:
+        if self.path is None:
+            return
+        if len(self._pending) >= self.max_pending:
+            # The disk is not keeping up; never let the log slow down or grow requests' memory.
+            self.dropped += 1
+            return
+        self._pending.append(dumps(entry) + b"\n")
+        self._ensure_started()
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop or self._flusher is None or self._flusher.done():
+            self._loop = loop
+            self._flusher = asyncio.create_task(self._run_flusher(), context=contextvars.Context())
+
+    async def _run_flusher(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+        lines, self._pending = self._pending, []
+        await asyncio.to_thread(self._write, b"".join(lines))
+        self.written += len(lines)
+
+    def _write(self, data: bytes) -> None:
+        # One O_APPEND write per flush keeps lines from several workers whole.
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+        finally:
+            os.close(fd)
+
+    async def close(self) -> None:
+        if self._flusher is not None and self._loop is asyncio.get_running_loop():
+            self._flusher.cancel()
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        self._flusher = None
+        await self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "enabled": self.enabled,
+            "pending": len(self._pending),
+            "written": self.written,
+            "dropped": self.dropped
+        }
@@ -1,31 +1,169 @@
-import json
-import random
 import uuid
 import os
-from typing import Dict, Any, Optional
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import JSONResponse
+import time
+import logging
+import math
+import asyncio
+import hmac
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Callable, Awaitable, TYPE_CHECKING
+from fastapi import FastAPI, HTTPException, Request, Response, Query
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from evaluator import MathEvaluator
+from dotenv import load_dotenv
+from upstream import UpstreamUnavailableError
+from session_store import create_session_store
+from problem_bank import LazyProblemBank, summarize_problem, InMemoryProblemBank
+from task_store import TaskStore, TaskWorkerPool, QueueFullError
+from metrics import registry as metrics_registry, MetricsMiddleware
+from serialization import dumps, FastJSONResponse
+from participant import ParticipantClient, ParticipantError
+from submission_log import SubmissionLog, build_entry
+from admission import AdmissionController, AdmissionRejected
+from idempotency import IdempotencyStore, IdempotencyConflict, fingerprint
+from tracing import Tracer, TracingMiddleware, span
+from profiler import SamplingProfiler, ProfilerBusy, MAX_PROFILE_SECONDS, summarize, collapsed
 from a2a_handler import (
     A2AAgentCard,
+    CachedCard,
     parse_a2a_request,
     create_a2a_response,
-    extract_skill_from_messages
+    stream_task_events,
+    wants_stream,
+    SkillRegistry,
+    agent_skills,
+    launcher_skills,
+    SESSION_ID_PATTERN,
+    PROBLEM_ID_PATTERN,
+    SOLUTION_PATTERN,
+    PARTICIPANT_URL_PATTERN
 )
 import uvicorn
 
+if TYPE_CHECKING:
+    from evaluator import MathEvaluator
+
+load_dotenv()
+
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "30"))
+
+# Build the evaluator and load the problem bank at startup instead of on the first request.
+WARMUP = os.getenv("WARMUP", "false").lower() in ("1", "true", "yes")
+
+
+def warm_up(app: FastAPI) -> None:
+    if app is agent_app:
+        get_evaluator()
+    len(problem_bank)
+
+
+# Apps started in this process and not yet shut down. run_agent.py serves both apps on one
+# loop, so the resources they share are closed only when the last of them stops.
+_running_apps = 0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global _running_apps
+    if WARMUP:
+        started = time.perf_counter()
+        await asyncio.to_thread(warm_up, app)
+        logger.info("%s warmed up in %.2fs", app.title, time.perf_counter() - started)
+    _running_apps += 1
+    yield
+    _running_apps -= 1
+    if _running_apps == 0:
+        # Let queued and running background tasks finish before the worker exits; they may
+        # still be calling participants, so the clients are closed only after the drain.
+        await task_pool.drain(SHUTDOWN_DRAIN_TIMEOUT)
+        await participant_client.aclose()
+        await submission_log.close()
+        await tracer.close()
+
+
 app = FastAPI(title="Math Evaluator Green Agent")
-agent_app = FastAPI(title="Agent Server")
-launcher_app = FastAPI(title="Launcher Server")
+agent_app = FastAPI(title="Agent Server", lifespan=lifespan, default_response_class=FastJSONResponse)
+launcher_app = FastAPI(title="Launcher Server", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+tracer = Tracer.from_env()
+
+agent_app.add_middleware(MetricsMiddleware, app_name="agent")
+launcher_app.add_middleware(MetricsMiddleware, app_name="launcher")
+agent_app.add_middleware(TracingMiddleware, tracer=tracer, app_name="agent")
+launcher_app.add_middleware(TracingMiddleware, tracer=tracer, app_name="launcher")
+
+logger = logging.getLogger(__name__)
+
+# Neither is needed to import this module; both are built on first use (or at startup
+# with WARMUP). The launcher only grades for run_evaluation.
+problem_bank = LazyProblemBank(os.getenv("PROBLEM_BANK_PATH", "math_problems.json"))
+
+_evaluator: Optional["MathEvaluator"] = None
+_evaluator_lock = threading.Lock()
+
+
+def get_evaluator() -> "MathEvaluator":
+    global _evaluator
+    if _evaluator is not None:
+        return _evaluator
+
+    with _evaluator_lock:
+        if _evaluator is None:
+            from evaluator import MathEvaluator
 
-evaluator = MathEvaluator()
+            evaluator = MathEvaluator()
+            if isinstance(problem_bank.bank, InMemoryProblemBank):
+                # Build each problem's prompt segment and canonical answer once; SQLite banks
+                # build them on first use.
+                for problem_id, issue in evaluator.prepare_problems(problem_bank.iterate()).items():
+                    logger.warning(
+                        "Problem %s: answer cannot be canonicalized (%s); it will always be graded by the LLM",
+                        problem_id, issue
+                    )
+            _evaluator = evaluator
+    return _evaluator
 
-with open("math_problems.json", "r") as f:
-    problems_data = json.load(f)
-    PROBLEMS = {p["id"]: p for p in problems_data["problems"]}
 
-session_problems: Dict[str, list] = {}
+async def aget_evaluator() -> "MathEvaluator":
+    # The first construction imports the OpenAI SDK and prepares every problem, which would
+    # stall the event loop; it runs in a thread so other requests keep being served.
+    if _evaluator is not None:
+        return _evaluator
+    return await asyncio.to_thread(get_evaluator)
+
+sessions = create_session_store()
+
+tasks = TaskStore.from_env()
+task_pool = TaskWorkerPool.from_env(tasks)
+
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE", "1000"))
+
+submission_log = SubmissionLog.from_env()
+
+admission = AdmissionController.from_env()
+idempotency = IdempotencyStore.from_env()
+
+participant_client = ParticipantClient.from_env()
+
+# Admin endpoints are disabled (404) unless a token is configured.
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+profiler = SamplingProfiler(interval=float(os.getenv("PROFILE_INTERVAL", "0.005")))
+RUN_EVALUATION_CONCURRENCY = int(os.getenv("RUN_EVALUATION_CONCURRENCY", "8"))
+RUN_EVALUATION_MAX_CONCURRENCY = int(os.getenv("RUN_EVALUATION_MAX_CONCURRENCY", "64"))
+
+metrics_registry.gauge("active_sessions", "Sessions in the session store.", collect=sessions.count)
+metrics_registry.gauge("background_tasks_queued", "Background tasks waiting for a worker.", collect=lambda: task_pool.stats()["queued"])
+metrics_registry.gauge("admission_active", "Grading requests holding an admission slot.", collect=lambda: admission.active)
+metrics_registry.gauge("admission_queued", "Grading requests waiting for an admission slot.", collect=lambda: admission.queued)
+metrics_registry.gauge("submission_log_pending", "Logged submissions waiting to be flushed.", collect=lambda: submission_log.stats()["pending"])
+metrics_registry.gauge("submission_log_dropped", "Submissions dropped because the log could not keep up.", collect=lambda: submission_log.dropped)
+metrics_registry.gauge("traces_dropped", "Traces dropped because the trace file could not keep up.", collect=lambda: tracer.log.dropped)
+
+CARD_MAX_AGE = int(os.getenv("CARD_MAX_AGE", "300"))
+agent_card_cache = CachedCard(A2AAgentCard.get_agent_card, CARD_MAX_AGE)
+launcher_card_cache = CachedCard(A2AAgentCard.get_launcher_card, CARD_MAX_AGE)
 
 
 class ProblemRequest(BaseModel):
@@ -42,7 +180,185 @@ class EvaluationResponse(BaseModel):
     score: int
     correct: bool
     feedback: str
+    tier: Optional[str] = None
     expected_answer: Optional[str] = None
+    usage: Optional[Dict[str, int]] = None
+
+
+class BatchItem(BaseModel):
+    problem_id: str
+    solution: str
+
+
+class BatchSubmission(BaseModel):
+    session_id: Optional[str] = None
+    items: List[BatchItem]
+
+
+# The caller_key() of the A2A request a skill is running for, including in the background.
+# Its gradings are admitted under it and its background tasks are looked up under it.
+_caller: ContextVar[Optional[str]] = ContextVar("caller", default=None)
+
+
+def grading_window() -> asyncio.Semaphore:
+    # One batch or run never has more gradings queued than a single caller is allowed, so it
+    # is not rejected by its own items.
+    return asyncio.Semaphore(max(1, admission.max_queue_per_key))
+
+
+def rejected_item(problem_id: str, rejection: AdmissionRejected) -> Dict[str, Any]:
+    return {"problem_id": problem_id, "error": str(rejection), "retryable": True}
+
+
+async def evaluate_item(
+    problem_id: str,
+    solution: str,
+    session_id: Optional[str] = None,
+    admit_as: Optional[str] = None
+) -> Dict[str, Any]:
+    with span("problem_bank"):
+        problem = problem_bank.get(problem_id)
+    
+    if problem is None:
+        return {"problem_id": problem_id, "error": f"Problem {problem_id} not found"}
+    
+    if not solution:
+        return {"problem_id": problem_id, "error": "Missing required parameter: solution"}
+    
+    evaluator = await aget_evaluator()
+    try:
+        evaluation = await evaluator.grade(
+            problem=problem["problem"],
+            expected_answer=problem["answer"],
+            agent_solution=solution,
+            explanation=problem.get("explanation", ""),
+            problem_id=problem_id,
+            difficulty=problem["difficulty"],
+            canonical=evaluator.canonical_answer(problem),
+            admit=(lambda: admission.admit(admit_as)) if admit_as else None
+        )
+    except UpstreamUnavailableError as e:
+        return {"problem_id": problem_id, "error": f"Grading unavailable, retry later: {str(e)}", "retryable": True}
+    
+    submission_log.record(build_entry(problem_id, solution, evaluation, evaluator.prompt_version, session_id))
+    
+    return {
+        "problem_id": problem_id,
+        "score": evaluation["score"],
+        "correct": evaluation["correct"],
+        "feedback": evaluation["feedback"],
+        "tier": evaluation["tier"],
+        "expected_answer": problem["answer"] if evaluation["score"] < 100 else None,
+        "usage": evaluation.get("usage")
+    }
+
+
+def summarize_batch(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    graded = [r for r in results if "error" not in r]
+    total_score = sum(r["score"] for r in graded)
+    tiers: Dict[str, int] = {}
+    usage = {"prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+    for r in graded:
+        tiers[r["tier"]] = tiers.get(r["tier"], 0) + 1
+        for key, tokens in (r.get("usage") or {}).items():
+            usage[key] = usage.get(key, 0) + tokens
+    
+    return {
+        "total_items": len(results),
+        "graded": len(graded),
+        "failed": len(results) - len(graded),
+        "correct": sum(1 for r in graded if r["correct"]),
+        "total_score": total_score,
+        "max_score": 100 * len(graded),
+        "average_score": round(total_score / len(graded), 2) if graded else 0.0,
+        "tiers": tiers,
+        "usage": usage
+    }
+
+
+async def evaluate_batch(
+    items: List[Dict[str, Any]],
+    on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None,
+    session_id: Optional[str] = None,
+    admit_as: Optional[str] = None
+) -> Dict[str, Any]:
+    window = grading_window()
+    
+    async def evaluate_indexed(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+        problem_id = str(item.get("problem_id", ""))
+        async with window:
+            try:
+                result = await evaluate_item(problem_id, item.get("solution"), session_id, admit_as)
+            except AdmissionRejected as e:
+                result = rejected_item(problem_id, e)
+        if on_result is not None:
+            on_result(index, result)
+        return result
+    
+    # Each item that needs the LLM is admitted on its own, like a single submission, so a large
+    # batch shares grading slots fairly with other callers instead of running under one slot.
+    results = await asyncio.gather(*(
+        evaluate_indexed(index, item)
+        for index, item in enumerate(items)
+    ))
+    
+    return {
+        "results": results,
+        "summary": summarize_batch(results)
+    }
+
+
+def task_key(scope: str, task_id: str) -> str:
+    # Background tasks are stored per session or caller, like idempotency keys, so a client
+    # that reuses or guesses someone else's task_id never sees that task.
+    return f"{scope}:{task_id}"
+
+
+async def submit_background_task(
+    scope: str,
+    task_id: str,
+    run: Callable[[], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Any]:
+    pending = create_a2a_response(task_id=task_id, status="working")
+    
+    try:
+        await task_pool.submit(
+            task_key(scope, task_id),
+            pending,
+            run,
+            on_error=lambda e: create_a2a_response(
+                task_id=task_id,
+                status="failed",
+                error=f"Error processing request: {str(e)}"
+            )
+        )
+    except QueueFullError as e:
+        return create_a2a_response(task_id=task_id, status="failed", error=str(e))
+    
+    return pending
+
+
+async def get_task_response(task_id: str, parameters: Dict[str, Any]) -> Dict[str, Any]:
+    requested_id = parameters.get("task_id")
+    
+    if not requested_id:
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error="Missing required parameter: task_id"
+        )
+    
+    caller = _caller.get()
+    task = await tasks.get(task_key(scoped_key(caller, parameters.get("session_id")), requested_id)) if caller else None
+    
+    if task is None:
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error=f"Task {requested_id} not found"
+        )
+    
+    return task
 
 
 @agent_app.get("/")
@@ -58,19 +374,256 @@ async def agent_root():
 
 @agent_app.get("/health")
 async def agent_health():
-    return {"status": "healthy", "service": "agent"}
+    return FastJSONResponse({"status": "healthy", "service": "agent"})
 
 
 @agent_app.get("/.well-known/agent.json")
-async def agent_card():
-    return A2AAgentCard.get_agent_card()
+async def agent_card(request: Request):
+    return agent_card_cache.response(request)
 
 
-@agent_app.post("/a2a")
-async def a2a_agent_endpoint(request: Request):
+@agent_skills.skill(
+    "get_math_problem",
+    name="Get Math Problem",
+    description="Provides a random math problem from the curated problem set",
+    parameters={
+        "session_id": {
+            "type": "string",
+            "required": True,
+            "description": "Session identifier to track problem distribution"
+        }
+    },
+    intents=("get problem", "math problem"),
+    extractors={"session_id": SESSION_ID_PATTERN}
+)
+async def get_math_problem_skill(
+    task_id: str,
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    session_id = parameters.get("session_id", str(uuid.uuid4()))
+    
+    with span("session"):
+        index = await sessions.adraw_index(session_id, len(problem_bank))
+    
+    if index is None:
+        return create_a2a_response(
+            task_id=task_id,
+            status="completed",
+            result={
+                "message": "All problems have been attempted",
+                "total_problems": len(problem_bank)
+            }
+        )
+    
+    with span("problem_bank"):
+        problem = problem_bank.problem_at(index)
+    
+    return create_a2a_response(
+        task_id=task_id,
+        status="completed",
+        result={
+            "session_id": session_id,
+            "problem_id": problem["id"],
+            "problem": problem["problem"],
+            "difficulty": problem["difficulty"]
+        }
+    )
+
+
+@agent_skills.skill(
+    "evaluate_solution",
+    name="Evaluate Math Solution",
+    description="Evaluates a submitted math solution using GPT-5",
+    parameters={
+        "session_id": {
+            "type": "string",
+            "required": True
+        },
+        "problem_id": {
+            "type": "string",
+            "required": True
+        },
+        "solution": {
+            "type": "string",
+            "required": True
+        }
+    },
+    intents=("evaluate", "grade", "check"),
+    extractors={
+        "session_id": SESSION_ID_PATTERN,
+        "problem_id": PROBLEM_ID_PATTERN,
+        "solution": SOLUTION_PATTERN
+    },
+    idempotent=True
+)
+async def evaluate_solution_skill(
+    task_id: str,
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    session_id = parameters.get("session_id")
+    problem_id = parameters.get("problem_id")
+    solution = parameters.get("solution")
+    
+    if not all([session_id, problem_id, solution]):
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error="Missing required parameters: session_id, problem_id, solution"
+        )
+    
+    evaluation = await evaluate_item(problem_id, solution, session_id, _caller.get())
+    
+    if "error" in evaluation:
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error=evaluation["error"]
+        )
+    
+    return create_a2a_response(
+        task_id=task_id,
+        status="completed",
+        result={
+            "session_id": session_id,
+            **evaluation
+        }
+    )
+
+
+@agent_skills.skill(
+    "evaluate_solutions_batch",
+    name="Evaluate Math Solutions (Batch)",
+    description="Evaluates many submitted solutions concurrently and returns per-item results with aggregate totals",
+    parameters={
+        "session_id": {
+            "type": "string",
+            "required": False
+        },
+        "items": {
+            "type": "array",
+            "required": True,
+            "description": "List of {problem_id, solution} objects"
+        }
+    },
+    idempotent=True
+)
+async def evaluate_solutions_batch_skill(
+    task_id: str,
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    items = parameters.get("items")
+    
+    if not isinstance(items, list) or not items:
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error="Missing required parameter: items"
+        )
+    
+    if len(items) > MAX_BATCH_SIZE:
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error=f"Batch too large: {len(items)} items (maximum {MAX_BATCH_SIZE})"
+        )
+    
+    if not all(isinstance(item, dict) for item in items):
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error="Each item must be an object with problem_id and solution"
+        )
+    
+    batch = await evaluate_batch(items, on_result=(
+        (lambda index, item: on_partial({"index": index, "item": item}))
+        if on_partial else None
+    ), session_id=parameters.get("session_id"), admit_as=_caller.get())
+    
+    return create_a2a_response(
+        task_id=task_id,
+        status="completed",
+        result={
+            "session_id": parameters.get("session_id"),
+            **batch
+        }
+    )
+
+
+@agent_skills.skill(
+    "get_task",
+    name="Get Task",
+    description="Retrieves the status and result of a task submitted with background=true",
+    parameters={
+        "task_id": {
+            "type": "string",
+            "required": True
+        },
+        "session_id": {
+            "type": "string",
+            "required": False,
+            "description": "Session the task was submitted with, if any"
+        }
+    }
+)
+async def get_task_skill(
+    task_id: str,
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    return await get_task_response(task_id, parameters)
+
+
+def caller_key(request: Request) -> str:
+    # Admission is fair between callers, not sessions, so opening more sessions never buys
+    # a caller more turns.
+    return f"caller:{request.client.host if request.client else 'unknown'}"
+
+
+def scoped_key(caller: str, session_id: Optional[str] = None) -> str:
+    # Idempotency keys and background tasks belong to a caller and, when given, a session.
+    return f"{caller}:session:{session_id}" if session_id else caller
+
+
+async def dispatch_for_caller(
+    registry: SkillRegistry,
+    caller: str,
+    task_id: str,
+    skill_id: Optional[str],
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    token = _caller.set(caller)
+    try:
+        return await registry.dispatch(task_id, skill_id, parameters, on_partial)
+    finally:
+        _caller.reset(token)
+
+
+def replayable(response: Dict[str, Any]) -> bool:
+    # A batch or run with items that could not be graded right now is not a final outcome;
+    # a retry with the same key grades them again instead of replaying the failures.
+    if response.get("status") != "completed":
+        return False
+    return not any(item.get("retryable") for item in (response.get("result") or {}).get("results", ()))
+
+
+def a2a_json(
+    content: Dict[str, Any],
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None
+) -> Response:
+    with span("a2a.serialize"):
+        return FastJSONResponse(content, status_code=status_code, headers=headers)
+
+
+async def handle_a2a(request: Request, registry: SkillRegistry) -> Response:
     try:
-        data = await request.json()
-        a2a_request = parse_a2a_request(data)
+        with span("a2a.read"):
+            body = await request.body()
+        a2a_request = parse_a2a_request(body)
         
         task_id = a2a_request.task_id or str(uuid.uuid4())
         
@@ -78,166 +631,230 @@ async def a2a_agent_endpoint(request: Request):
         parameters = a2a_request.parameters or {}
         
         if not skill_id and a2a_request.messages:
-            skill_id, extracted_params = extract_skill_from_messages(a2a_request.messages)
+            skill_id, extracted_params = registry.route(a2a_request.messages)
             parameters.update(extracted_params)
         
-        if skill_id == "get_math_problem":
-            session_id = parameters.get("session_id", str(uuid.uuid4()))
-            
-            if session_id not in session_problems:
-                session_problems[session_id] = []
-            
-            available_problems = [
-                p for p_id, p in PROBLEMS.items() 
-                if p_id not in session_problems[session_id]
-            ]
-            
-            if not available_problems:
-                return create_a2a_response(
-                    task_id=task_id,
-                    status="completed",
-                    result={
-                        "message": "All problems have been attempted",
-                        "total_problems": len(PROBLEMS)
-                    }
-                )
-            
-            problem = random.choice(available_problems)
-            session_problems[session_id].append(problem["id"])
-            
-            return create_a2a_response(
-                task_id=task_id,
-                status="completed",
-                result={
-                    "session_id": session_id,
-                    "problem_id": problem["id"],
-                    "problem": problem["problem"],
-                    "difficulty": problem["difficulty"]
-                }
+        caller = caller_key(request)
+        scope = scoped_key(caller, parameters.get("session_id"))
+        
+        if a2a_request.background:
+            existing = await tasks.get(task_key(scope, task_id)) if a2a_request.task_id else None
+            if existing is not None:
+                # A retried submission; report the task that is already running or done.
+                return a2a_json(existing)
+            return a2a_json(await submit_background_task(
+                scope,
+                task_id,
+                lambda: dispatch_for_caller(registry, caller, task_id, skill_id, parameters)
+            ))
+        
+        if wants_stream(request, a2a_request):
+            return StreamingResponse(
+                stream_task_events(
+                    task_id,
+                    lambda on_partial: dispatch_for_caller(registry, caller, task_id, skill_id, parameters, on_partial)
+                ),
+                media_type="text/event-stream"
             )
         
-        elif skill_id == "evaluate_solution":
-            session_id = parameters.get("session_id")
-            problem_id = parameters.get("problem_id")
-            solution = parameters.get("solution")
-            
-            if not all([session_id, problem_id, solution]):
-                return create_a2a_response(
-                    task_id=task_id,
-                    status="failed",
-                    error="Missing required parameters: session_id, problem_id, solution"
-                )
-            
-            if problem_id not in PROBLEMS:
-                return create_a2a_response(
-                    task_id=task_id,
-                    status="failed",
-                    error=f"Problem {problem_id} not found"
-                )
-            
-            problem = PROBLEMS[problem_id]
+        skill = registry.get(skill_id)
+        explicit_key = request.headers.get("idempotency-key")
+        idempotency_key = explicit_key or a2a_request.task_id
+        
+        try:
+            if skill is None or not skill.idempotent or not idempotency_key:
+                return a2a_json(await dispatch_for_caller(registry, caller, task_id, skill_id, parameters))
             
-            evaluation = evaluator.evaluate_solution(
-                problem=problem["problem"],
-                expected_answer=problem["answer"],
-                agent_solution=solution,
-                explanation=problem.get("explanation", "")
+            # Keys are scoped per caller and session, so two clients picking the same task_id never collide.
+            response, replayed = await idempotency.run(
+                f"{registry.name}:{scope}:{idempotency_key}",
+                fingerprint(skill_id, parameters),
+                lambda: dispatch_for_caller(registry, caller, task_id, skill_id, parameters),
+                storable=replayable,
+                strict=explicit_key is not None
             )
-            
-            return create_a2a_response(
-                task_id=task_id,
-                status="completed",
-                result={
-                    "session_id": session_id,
-                    "problem_id": problem_id,
-                    "score": evaluation["score"],
-                    "correct": evaluation["correct"],
-                    "feedback": evaluation["feedback"],
-                    "expected_answer": problem["answer"] if evaluation["score"] < 100 else None
-                }
+            return a2a_json(response, headers={"Idempotent-Replayed": "true"} if replayed else None)
+        except AdmissionRejected as e:
+            return a2a_json(
+                create_a2a_response(task_id=task_id, status="failed", error=str(e)),
+                status_code=e.status_code,
+                headers=e.headers()
             )
-        
-        else:
-            return create_a2a_response(
-                task_id=task_id,
-                status="failed",
-                error=f"Unknown skill: {skill_id}"
+        except IdempotencyConflict as e:
+            return a2a_json(
+                create_a2a_response(task_id=task_id, status="failed", error=str(e)),
+                status_code=422
             )
     
     except Exception as e:
-        return create_a2a_response(
+        return a2a_json(create_a2a_response(
             task_id=task_id if 'task_id' in locals() else str(uuid.uuid4()),
             status="failed",
             error=f"Error processing request: {str(e)}"
-        )
+        ))
+
+
+@agent_app.post("/a2a")
+async def a2a_agent_endpoint(request: Request):
+    return await handle_a2a(request, agent_skills)
 
 
 @agent_app.post("/get_problem")
 async def get_problem(request: ProblemRequest):
     session_id = request.session_id
     
-    if session_id not in session_problems:
-        session_problems[session_id] = []
+    index = await sessions.adraw_index(session_id, len(problem_bank))
     
-    available_problems = [
-        p for p_id, p in PROBLEMS.items() 
-        if p_id not in session_problems[session_id]
-    ]
-    
-    if not available_problems:
-        return JSONResponse({
+    if index is None:
+        return FastJSONResponse({
             "status": "completed",
             "message": "All problems have been attempted",
-            "total_problems": len(PROBLEMS)
+            "total_problems": len(problem_bank)
         })
     
-    problem = random.choice(available_problems)
-    session_problems[session_id].append(problem["id"])
+    problem = problem_bank.problem_at(index)
     
-    return {
+    return FastJSONResponse({
         "problem_id": problem["id"],
         "problem": problem["problem"],
         "difficulty": problem["difficulty"]
-    }
+    })
 
 
-@agent_app.post("/submit_solution")
-async def submit_solution(submission: SolutionSubmission):
+@agent_app.post("/submit_solution", response_model=EvaluationResponse)
+async def submit_solution(submission: SolutionSubmission, request: Request):
     problem_id = submission.problem_id
     
-    if problem_id not in PROBLEMS:
+    problem = problem_bank.get(problem_id)
+    
+    if problem is None:
         raise HTTPException(status_code=404, detail="Problem not found")
     
-    problem = PROBLEMS[problem_id]
+    evaluator = await aget_evaluator()
+    try:
+        evaluation = await evaluator.grade(
+            problem=problem["problem"],
+            expected_answer=problem["answer"],
+            agent_solution=submission.solution,
+            explanation=problem.get("explanation", ""),
+            problem_id=problem_id,
+            difficulty=problem["difficulty"],
+            canonical=evaluator.canonical_answer(problem),
+            admit=lambda: admission.admit(caller_key(request))
+        )
+    except AdmissionRejected as e:
+        raise HTTPException(status_code=e.status_code, detail=str(e), headers=e.headers())
+    except UpstreamUnavailableError as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"Grading unavailable, retry later: {str(e)}",
+            headers={"Retry-After": str(math.ceil(e.retry_after or 1))}
+        )
     
-    evaluation = evaluator.evaluate_solution(
-        problem=problem["problem"],
-        expected_answer=problem["answer"],
-        agent_solution=submission.solution,
-        explanation=problem.get("explanation", "")
-    )
+    submission_log.record(build_entry(
+        problem_id, submission.solution, evaluation, evaluator.prompt_version, submission.session_id
+    ))
     
-    return EvaluationResponse(
-        score=evaluation["score"],
-        correct=evaluation["correct"],
-        feedback=evaluation["feedback"],
-        expected_answer=problem["answer"] if evaluation["score"] < 100 else None
+    return FastJSONResponse({
+        "score": evaluation["score"],
+        "correct": evaluation["correct"],
+        "feedback": evaluation["feedback"],
+        "tier": evaluation["tier"],
+        "expected_answer": problem["answer"] if evaluation["score"] < 100 else None,
+        "usage": evaluation.get("usage")
+    })
+
+
+@agent_app.post("/submit_solutions_batch")
+async def submit_solutions_batch(submission: BatchSubmission, request: Request):
+    if len(submission.items) > MAX_BATCH_SIZE:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(submission.items)} items (maximum {MAX_BATCH_SIZE})"
+        )
+    
+    batch = await evaluate_batch(
+        [item.model_dump() for item in submission.items],
+        session_id=submission.session_id,
+        admit_as=caller_key(request)
     )
+    
+    return FastJSONResponse({
+        "session_id": submission.session_id,
+        **batch
+    })
+
+
+@agent_app.get("/tasks/{task_id}")
+async def get_agent_task(task_id: str, request: Request, session_id: Optional[str] = None):
+    task = await tasks.get(task_key(scoped_key(caller_key(request), session_id), task_id))
+    
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    return FastJSONResponse(task)
+
+
+@agent_app.get("/cache/stats")
+async def cache_stats():
+    return (await aget_evaluator()).cache.stats()
+
+
+@agent_app.get("/admission/stats")
+async def admission_stats():
+    return admission.stats()
+
+
+@agent_app.get("/idempotency/stats")
+async def idempotency_stats():
+    return idempotency.stats()
+
+
+@agent_app.get("/upstream/stats")
+async def upstream_stats():
+    return (await aget_evaluator()).upstream.stats()
+
+
+@agent_app.get("/metrics")
+async def agent_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
 
 
 @agent_app.get("/problems")
-async def list_problems():
-    return {
-        "total": len(PROBLEMS),
+async def list_problems(
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    difficulty: Optional[str] = None,
+    topic: Optional[str] = None
+):
+    return FastJSONResponse({
+        "total": problem_bank.count(difficulty, topic),
+        "offset": offset,
+        "limit": limit,
         "problems": [
-            {
-                "id": p["id"],
-                "difficulty": p["difficulty"],
-                "problem": p["problem"]
-            }
-            for p in PROBLEMS.values()
+            summarize_problem(p)
+            for p in problem_bank.page(offset, limit, difficulty, topic)
         ]
-    }
+    })
+
+
+@agent_app.get("/problems/stream")
+async def stream_problems(difficulty: Optional[str] = None, topic: Optional[str] = None):
+    def lines():
+        for p in problem_bank.iterate(difficulty, topic):
+            yield dumps(summarize_problem(p)) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@agent_app.get("/problems/random")
+async def random_problem(difficulty: Optional[str] = None, topic: Optional[str] = None):
+    problem = problem_bank.random_problem(difficulty, topic)
+    
+    if problem is None:
+        raise HTTPException(status_code=404, detail="No problem matches the given filters")
+    
+    return FastJSONResponse(summarize_problem(problem))
 
 
 @launcher_app.get("/")
@@ -253,111 +870,298 @@ async def launcher_root():
 
 @launcher_app.get("/health")
 async def launcher_health():
-    return {"status": "healthy", "service": "launcher"}
+    return FastJSONResponse({"status": "healthy", "service": "launcher"})
 
 
 @launcher_app.get("/.well-known/agent.json")
-async def launcher_card():
-    return A2AAgentCard.get_launcher_card()
+async def launcher_card(request: Request):
+    return launcher_card_cache.response(request)
 
 
-@launcher_app.post("/a2a")
-async def a2a_launcher_endpoint(request: Request):
-    try:
-        data = await request.json()
-        a2a_request = parse_a2a_request(data)
-        
-        task_id = a2a_request.task_id or str(uuid.uuid4())
-        
-        skill_id = a2a_request.skill_id
-        parameters = a2a_request.parameters or {}
-        
-        if not skill_id and a2a_request.messages:
-            skill_id, extracted_params = extract_skill_from_messages(a2a_request.messages)
-            parameters.update(extracted_params)
-        
-        if skill_id == "start_session":
-            session_id = str(uuid.uuid4())
-            session_problems[session_id] = []
-            agent_url = os.getenv("AGENT_URL", "http://localhost:8000")
-            
-            return create_a2a_response(
-                task_id=task_id,
-                status="completed",
-                result={
-                    "session_id": session_id,
-                    "total_problems": len(PROBLEMS),
-                    "agent_url": agent_url
-                }
-            )
-        
-        elif skill_id == "get_session_status":
-            session_id = parameters.get("session_id")
-            
-            if not session_id:
-                return create_a2a_response(
-                    task_id=task_id,
-                    status="failed",
-                    error="Missing required parameter: session_id"
-                )
-            
-            if session_id not in session_problems:
-                return create_a2a_response(
-                    task_id=task_id,
-                    status="failed",
-                    error=f"Session {session_id} not found"
-                )
-            
-            return create_a2a_response(
-                task_id=task_id,
-                status="completed",
-                result={
-                    "session_id": session_id,
-                    "problems_attempted": len(session_problems[session_id]),
-                    "total_problems": len(PROBLEMS),
-                    "remaining": len(PROBLEMS) - len(session_problems[session_id])
-                }
-            )
-        
-        else:
-            return create_a2a_response(
-                task_id=task_id,
-                status="failed",
-                error=f"Unknown skill: {skill_id}"
-            )
+@launcher_skills.skill(
+    "start_session",
+    name="Start Evaluation Session",
+    description="Creates a new evaluation session",
+    intents=("start session", "new session")
+)
+async def start_session_skill(
+    task_id: str,
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    session_id = str(uuid.uuid4())
+    with span("session"):
+        await sessions.acreate(session_id, len(problem_bank))
+    agent_url = os.getenv("AGENT_URL", "http://localhost:8000")
     
-    except Exception as e:
+    return create_a2a_response(
+        task_id=task_id,
+        status="completed",
+        result={
+            "session_id": session_id,
+            "total_problems": len(problem_bank),
+            "agent_url": agent_url
+        }
+    )
+
+
+@launcher_skills.skill(
+    "get_session_status",
+    name="Get Session Status",
+    description="Retrieves current session status",
+    parameters={
+        "session_id": {
+            "type": "string",
+            "required": True
+        }
+    },
+    intents=("session status", "check session"),
+    extractors={"session_id": SESSION_ID_PATTERN}
+)
+async def get_session_status_skill(
+    task_id: str,
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    session_id = parameters.get("session_id")
+    
+    if not session_id:
         return create_a2a_response(
-            task_id=task_id if 'task_id' in locals() else str(uuid.uuid4()),
+            task_id=task_id,
             status="failed",
-            error=f"Error processing request: {str(e)}"
+            error="Missing required parameter: session_id"
+        )
+    
+    with span("session"):
+        attempted = await sessions.aattempted_count(session_id)
+    
+    if attempted is None:
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error=f"Session {session_id} not found"
         )
+    
+    return create_a2a_response(
+        task_id=task_id,
+        status="completed",
+        result={
+            "session_id": session_id,
+            "problems_attempted": attempted,
+            "total_problems": len(problem_bank),
+            "remaining": len(problem_bank) - attempted
+        }
+    )
+
+
+@launcher_skills.skill(
+    "run_evaluation",
+    name="Run Evaluation",
+    description="Runs a complete evaluation session against a participant agent and returns an aggregate report",
+    parameters={
+        "participant_url": {
+            "type": "string",
+            "required": True,
+            "description": "Base URL or A2A endpoint of the participant agent"
+        },
+        "num_problems": {
+            "type": "integer",
+            "required": False,
+            "description": "Number of problems to pose (defaults to the whole problem set)"
+        },
+        "concurrency": {
+            "type": "integer",
+            "required": False,
+            "description": "Problems sent to the participant at once"
+        }
+    },
+    intents=("run evaluation", "evaluate agent"),
+    extractors={"participant_url": PARTICIPANT_URL_PATTERN},
+    idempotent=True
+)
+async def run_evaluation_skill(
+    task_id: str,
+    parameters: Dict[str, Any],
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    participant_url = parameters.get("participant_url")
+    
+    if not participant_url:
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error="Missing required parameter: participant_url"
+        )
+    
+    try:
+        num_problems = int(parameters.get("num_problems") or len(problem_bank))
+        concurrency = int(parameters.get("concurrency") or RUN_EVALUATION_CONCURRENCY)
+    except (TypeError, ValueError):
+        return create_a2a_response(
+            task_id=task_id,
+            status="failed",
+            error="num_problems and concurrency must be integers"
+        )
+    
+    concurrency = max(1, min(concurrency, RUN_EVALUATION_MAX_CONCURRENCY))
+    session_id = str(uuid.uuid4())
+    
+    def draw_problems() -> List[Dict[str, Any]]:
+        sessions.create(session_id, len(problem_bank))
+        problems = []
+        for _ in range(max(0, num_problems)):
+            index = sessions.draw_index(session_id, len(problem_bank))
+            if index is None:
+                break
+            problems.append(problem_bank.problem_at(index))
+        return problems
+    
+    # One thread for the whole draw; SQLite stores and banks may block on disk or locks.
+    problems = await asyncio.to_thread(draw_problems)
+    
+    semaphore = asyncio.Semaphore(concurrency)
+    window = grading_window()
+    admit_as = _caller.get()
+    latencies: List[float] = []
+    
+    async def pose(index: int, problem: Dict[str, Any]) -> Dict[str, Any]:
+        # Only participant calls hold a slot; each answer is graded as soon as it arrives,
+        # admitted like any single submission.
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                answer = await participant_client.solve(participant_url, problem)
+            except ParticipantError as e:
+                answer = None
+                result = {"problem_id": problem["id"], "error": f"Participant failed: {str(e)}"}
+            latencies.append(time.perf_counter() - started)
+        
+        if answer is not None:
+            async with window:
+                try:
+                    result = {**await evaluate_item(problem["id"], answer, session_id, admit_as), "answer": answer}
+                except AdmissionRejected as e:
+                    result = {**rejected_item(problem["id"], e), "answer": answer}
+        if on_partial is not None:
+            on_partial({"index": index, "item": result})
+        return result
+    
+    started = time.perf_counter()
+    results = await asyncio.gather(*(pose(index, problem) for index, problem in enumerate(problems)))
+    latencies.sort()
+    
+    return create_a2a_response(
+        task_id=task_id,
+        status="completed",
+        result={
+            "session_id": session_id,
+            "participant_url": participant_url,
+            "results": results,
+            "summary": {
+                **summarize_batch(results),
+                "participant_errors": sum(1 for r in results if r.get("error", "").startswith("Participant failed")),
+                "duration_seconds": round(time.perf_counter() - started, 3),
+                "participant_p50_ms": round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+                "participant_max_ms": round(latencies[-1] * 1000, 2) if latencies else None
+            }
+        }
+    )
+
+
+launcher_skills.add(agent_skills.get("get_task"))
+
+
+@launcher_app.post("/a2a")
+async def a2a_launcher_endpoint(request: Request):
+    return await handle_a2a(request, launcher_skills)
 
 
 @launcher_app.post("/start_session")
 async def start_session():
     session_id = str(uuid.uuid4())
-    session_problems[session_id] = []
+    await sessions.acreate(session_id, len(problem_bank))
     agent_url = os.getenv("AGENT_URL", "http://localhost:8000")
     
-    return {
+    return FastJSONResponse({
         "session_id": session_id,
-        "total_problems": len(PROBLEMS),
+        "total_problems": len(problem_bank),
         "agent_url": agent_url
-    }
+    })
 
 
 @launcher_app.get("/session/{session_id}")
 async def get_session_status(session_id: str):
-    if session_id not in session_problems:
+    attempted = await sessions.aattempted_count(session_id)
+    
+    if attempted is None:
         raise HTTPException(status_code=404, detail="Session not found")
     
-    return {
+    return FastJSONResponse({
         "session_id": session_id,
-        "problems_attempted": len(session_problems[session_id]),
-        "total_problems": len(PROBLEMS),
-        "remaining": len(PROBLEMS) - len(session_problems[session_id])
-    }
+        "problems_attempted": attempted,
+        "total_problems": len(problem_bank),
+        "remaining": len(problem_bank) - attempted
+    })
+
+
+@launcher_app.get("/metrics")
+async def launcher_metrics():
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+def check_admin(request: Request) -> None:
+    if ADMIN_TOKEN is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    provided = request.headers.get("authorization", "").removeprefix("Bearer ").strip()
+    if not hmac.compare_digest(provided.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+async def profile_response(request: Request, seconds: float, output: str, top: int) -> Response:
+    check_admin(request)
+    try:
+        # Sampling runs in a thread so the event loop keeps serving, and being profiled, meanwhile.
+        profile = await asyncio.to_thread(profiler.run, seconds)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if output == "collapsed":
+        return PlainTextResponse(collapsed(profile))
+    return FastJSONResponse(summarize(profile, top))
+
+
+@agent_app.get("/admin/profile")
+async def agent_profile(
+    request: Request,
+    seconds: float = Query(5, gt=0, le=MAX_PROFILE_SECONDS),
+    format: str = Query("summary", pattern="^(summary|collapsed)$"),
+    top: int = Query(25, ge=1, le=500)
+):
+    return await profile_response(request, seconds, format, top)
+
+
+@launcher_app.get("/admin/profile")
+async def launcher_profile(
+    request: Request,
+    seconds: float = Query(5, gt=0, le=MAX_PROFILE_SECONDS),
+    format: str = Query("summary", pattern="^(summary|collapsed)$"),
+    top: int = Query(25, ge=1, le=500)
+):
+    return await profile_response(request, seconds, format, top)
+
+
+@launcher_app.get("/tasks/{task_id}")
+async def get_launcher_task(task_id: str, request: Request, session_id: Optional[str] = None):
+    task = await tasks.get(task_key(scoped_key(caller_key(request), session_id), task_id))
+    
+    if task is None:
+        raise HTTPException(status_code=404, detail="Task not found")
+    
+    return FastJSONResponse(task)
+
+
+# Skills are all registered by now, so the cards can be serialized once.
+agent_card_cache.refresh()
+launcher_card_cache.refresh()
 
 
 def run_agent_server():
@@ -0,0 +1,92 @@
+import os
+import uuid
+import asyncio
+from typing import Dict, Any, Optional
+import httpx
+
+SOLVE_PROMPT = "Solve the following math problem. Reply with the final answer only.\n\n{problem}"
+
+_ANSWER_KEYS = ("answer", "solution", "content", "text", "message")
+
+
+class ParticipantError(Exception):
+    pass
+
+
+def participant_endpoint(url: str) -> str:
+    url = url.rstrip("/")
+    return url if url.endswith("/a2a") else f"{url}/a2a"
+
+
+def extract_answer(response: Dict[str, Any]) -> Optional[str]:
+    result = response.get("result")
+    if isinstance(result, str):
+        return result
+    if isinstance(result, dict):
+        for key in _ANSWER_KEYS:
+            value = result.get(key)
+            if isinstance(value, (str, int, float)) and not isinstance(value, bool):
+                return str(value)
+
+    for message in reversed(response.get("messages") or []):
+        if isinstance(message, dict) and message.get("role") != "user" and message.get("content"):
+            return str(message["content"])
+    return None
+
+
+class ParticipantClient:
+    def __init__(self, max_connections: int = 100, timeout: float = 60):
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def from_env(cls) -> "ParticipantClient":
+        return cls(
+            max_connections=int(os.getenv("PARTICIPANT_MAX_CONNECTIONS", "100")),
+            timeout=float(os.getenv("PARTICIPANT_TIMEOUT", "60"))
+        )
+
+    def _client_for_loop(self) -> httpx.AsyncClient:
+        # Pooled connections belong to the event loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._client is None or loop is not self._loop:
+            self._loop = loop
+            self._client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return self._client
+
+    async def solve(self, url: str, problem: Dict[str, Any]) -> str:
+        body = {
+            "task_id": str(uuid.uuid4()),
+            "messages": [{"role": "user", "content": SOLVE_PROMPT.format(problem=problem["problem"])}],
+            "parameters": {"problem_id": problem["id"], "problem": problem["problem"]}
+        }
+
+        try:
+            response = await self._client_for_loop().post(participant_endpoint(url), json=body)
+            response.raise_for_status()
+            data = response.json()
+        except httpx.HTTPStatusError as e:
+            raise ParticipantError(f"HTTP {e.response.status_code}")
+        except httpx.TimeoutException:
+            raise ParticipantError("Timed out")
+        except httpx.HTTPError as e:
+            raise ParticipantError(f"Request failed: {type(e).__name__}")
+        except ValueError:
+            raise ParticipantError("Response is not JSON")
+
+        if not isinstance(data, dict):
+            raise ParticipantError("Response is not a JSON object")
+        if data.get("status") == "failed":
+            raise ParticipantError(f"Task failed: {data.get('error') or 'no error given'}")
+
+        answer = extract_answer(data)
+        if answer is None:
+            raise ParticipantError("Response contains no answer")
+        return answer
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
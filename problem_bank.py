@@ -0,0 +1,330 @@
+import sys
+import json
+import random
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Iterator, Iterable
+from answers import AnswerIndex
+
+DEFAULT_TOPIC = "general"
+
+
+def summarize_problem(problem: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "id": problem["id"],
+        "difficulty": problem["difficulty"],
+        "topic": problem.get("topic", DEFAULT_TOPIC),
+        "problem": problem["problem"]
+    }
+
+
+class ProblemBank(ABC):
+    @abstractmethod
+    def __len__(self) -> int:
+        ...
+
+    @abstractmethod
+    def get(self, problem_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def problem_at(self, index: int) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def count(self, difficulty: Optional[str] = None, topic: Optional[str] = None) -> int:
+        ...
+
+    @abstractmethod
+    def filtered_at(self, ordinal: int, difficulty: Optional[str] = None, topic: Optional[str] = None) -> Dict[str, Any]:
+        ...
+
+    def __contains__(self, problem_id: str) -> bool:
+        return self.get(problem_id) is not None
+
+    def random_problem(self, difficulty: Optional[str] = None, topic: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        total = self.count(difficulty, topic)
+        if total == 0:
+            return None
+        return self.filtered_at(random.randrange(total), difficulty, topic)
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        difficulty: Optional[str] = None,
+        topic: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        end = min(offset + limit, self.count(difficulty, topic))
+        return [self.filtered_at(ordinal, difficulty, topic) for ordinal in range(offset, end)]
+
+    def iterate(
+        self,
+        difficulty: Optional[str] = None,
+        topic: Optional[str] = None,
+        page_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        offset = 0
+        while True:
+            page = self.page(offset, page_size, difficulty, topic)
+            if not page:
+                return
+            yield from page
+            offset += len(page)
+
+
+class InMemoryProblemBank(ProblemBank):
+    def __init__(self, problems: Iterable[Dict[str, Any]]):
+        self._problems: List[Dict[str, Any]] = list(problems)
+        self._by_id: Dict[str, int] = {}
+        self._filters: Dict[tuple, List[int]] = {}
+
+        for index, problem in enumerate(self._problems):
+            self._by_id[problem["id"]] = index
+            difficulty = problem["difficulty"]
+            topic = problem.get("topic", DEFAULT_TOPIC)
+            for key in ((difficulty, None), (None, topic), (difficulty, topic)):
+                self._filters.setdefault(key, []).append(index)
+
+    def __len__(self) -> int:
+        return len(self._problems)
+
+    def get(self, problem_id: str) -> Optional[Dict[str, Any]]:
+        index = self._by_id.get(problem_id)
+        return self._problems[index] if index is not None else None
+
+    def problem_at(self, index: int) -> Dict[str, Any]:
+        return self._problems[index]
+
+    def count(self, difficulty: Optional[str] = None, topic: Optional[str] = None) -> int:
+        if difficulty is None and topic is None:
+            return len(self._problems)
+        return len(self._filters.get((difficulty, topic), ()))
+
+    def filtered_at(self, ordinal: int, difficulty: Optional[str] = None, topic: Optional[str] = None) -> Dict[str, Any]:
+        if difficulty is None and topic is None:
+            return self._problems[ordinal]
+        return self._problems[self._filters[(difficulty, topic)][ordinal]]
+
+
+class SQLiteProblemBank(ProblemBank):
+    def __init__(self, path: str, cache_size: int = 4096):
+        self.path = path
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._counts: Dict[tuple, int] = {
+            (difficulty or None, topic or None): total
+            for difficulty, topic, total in self._db.execute(
+                "SELECT difficulty, topic, total FROM problem_counts"
+            )
+        }
+
+    def _row_problem(self, index: int, data: str) -> Dict[str, Any]:
+        problem = json.loads(data)
+        self._cache[index] = problem
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return problem
+
+    def __len__(self) -> int:
+        return self._counts.get((None, None), 0)
+
+    def get(self, problem_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT idx, data FROM problems WHERE id = ?",
+                (problem_id,)
+            ).fetchone()
+            return self._row_problem(*row) if row is not None else None
+
+    def problem_at(self, index: int) -> Dict[str, Any]:
+        with self._lock:
+            cached = self._cache.get(index)
+            if cached is not None:
+                self._cache.move_to_end(index)
+                return cached
+            row = self._db.execute(
+                "SELECT idx, data FROM problems WHERE idx = ?",
+                (index,)
+            ).fetchone()
+            if row is None:
+                raise IndexError(index)
+            return self._row_problem(*row)
+
+    def count(self, difficulty: Optional[str] = None, topic: Optional[str] = None) -> int:
+        return self._counts.get((difficulty, topic), 0)
+
+    def filtered_at(self, ordinal: int, difficulty: Optional[str] = None, topic: Optional[str] = None) -> Dict[str, Any]:
+        if difficulty is None and topic is None:
+            return self.problem_at(ordinal)
+
+        with self._lock:
+            row = self._db.execute(
+                "SELECT idx FROM problem_filters WHERE difficulty = ? AND topic = ? AND ordinal = ?",
+                (difficulty or "", topic or "", ordinal)
+            ).fetchone()
+        if row is None:
+            raise IndexError(ordinal)
+        return self.problem_at(row[0])
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        difficulty: Optional[str] = None,
+        topic: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        if limit <= 0:
+            return []
+        last = offset + limit - 1
+        with self._lock:
+            if difficulty is None and topic is None:
+                rows = self._db.execute(
+                    "SELECT idx, data FROM problems WHERE idx BETWEEN ? AND ? ORDER BY idx",
+                    (offset, last)
+                ).fetchall()
+            else:
+                rows = self._db.execute(
+                    "SELECT p.idx, p.data FROM problem_filters f JOIN problems p ON p.idx = f.idx "
+                    "WHERE f.difficulty = ? AND f.topic = ? AND f.ordinal BETWEEN ? AND ? ORDER BY f.ordinal",
+                    (difficulty or "", topic or "", offset, last)
+                ).fetchall()
+            # Pages are read without filling the cache, so iterating the whole bank does not
+            # evict the problems sessions are drawing.
+            return [self._cache.get(index) or json.loads(data) for index, data in rows]
+
+
+def iter_problem_file(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r") as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from json.load(f)["problems"]
+
+
+def build_sqlite_bank(source: str, target: str) -> int:
+    db = sqlite3.connect(target)
+    db.executescript(
+        """
+        DROP TABLE IF EXISTS problems;
+        DROP TABLE IF EXISTS problem_filters;
+        DROP TABLE IF EXISTS problem_counts;
+        CREATE TABLE problems (idx INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, data TEXT NOT NULL);
+        CREATE TABLE problem_filters (
+            difficulty TEXT NOT NULL, topic TEXT NOT NULL, ordinal INTEGER NOT NULL, idx INTEGER NOT NULL,
+            PRIMARY KEY (difficulty, topic, ordinal)
+        ) WITHOUT ROWID;
+        CREATE TABLE problem_counts (
+            difficulty TEXT NOT NULL, topic TEXT NOT NULL, total INTEGER NOT NULL,
+            PRIMARY KEY (difficulty, topic)
+        );
+        """
+    )
+
+    counts: Dict[tuple, int] = {}
+    total = 0
+    with db:
+        for index, problem in enumerate(iter_problem_file(source)):
+            db.execute(
+                "INSERT INTO problems (idx, id, data) VALUES (?, ?, ?)",
+                (index, problem["id"], json.dumps(problem))
+            )
+            difficulty = problem["difficulty"]
+            topic = problem.get("topic", DEFAULT_TOPIC)
+            for key in ((difficulty, ""), ("", topic), (difficulty, topic)):
+                ordinal = counts.get(key, 0)
+                db.execute(
+                    "INSERT INTO problem_filters (difficulty, topic, ordinal, idx) VALUES (?, ?, ?, ?)",
+                    (key[0], key[1], ordinal, index)
+                )
+                counts[key] = ordinal + 1
+            total += 1
+
+        counts[("", "")] = total
+        db.executemany(
+            "INSERT INTO problem_counts (difficulty, topic, total) VALUES (?, ?, ?)",
+            [(difficulty, topic, n) for (difficulty, topic), n in counts.items()]
+        )
+
+    db.close()
+    return total
+
+
+def load_problem_bank(path: str) -> ProblemBank:
+    if path.endswith((".db", ".sqlite", ".sqlite3")):
+        return SQLiteProblemBank(path)
+    return InMemoryProblemBank(iter_problem_file(path))
+
+
+class LazyProblemBank(ProblemBank):
+    # Defers reading the bank until it is first used, so importing a server that
+    # only needs it for some endpoints stays cheap.
+    def __init__(self, path: str):
+        self.path = path
+        self._bank: Optional[ProblemBank] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._bank is not None
+
+    @property
+    def bank(self) -> ProblemBank:
+        if self._bank is None:
+            with self._lock:
+                if self._bank is None:
+                    self._bank = load_problem_bank(self.path)
+        return self._bank
+
+    def __len__(self) -> int:
+        return len(self.bank)
+
+    def get(self, problem_id: str) -> Optional[Dict[str, Any]]:
+        return self.bank.get(problem_id)
+
+    def problem_at(self, index: int) -> Dict[str, Any]:
+        return self.bank.problem_at(index)
+
+    def count(self, difficulty: Optional[str] = None, topic: Optional[str] = None) -> int:
+        return self.bank.count(difficulty, topic)
+
+    def filtered_at(self, ordinal: int, difficulty: Optional[str] = None, topic: Optional[str] = None) -> Dict[str, Any]:
+        return self.bank.filtered_at(ordinal, difficulty, topic)
+
+    def page(
+        self,
+        offset: int = 0,
+        limit: int = 100,
+        difficulty: Optional[str] = None,
+        topic: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        return self.bank.page(offset, limit, difficulty, topic)
+
+    def iterate(
+        self,
+        difficulty: Optional[str] = None,
+        topic: Optional[str] = None,
+        page_size: int = 500
+    ) -> Iterator[Dict[str, Any]]:
+        return self.bank.iterate(difficulty, topic, page_size)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 4 or sys.argv[1] != "build":
+        print("Usage: python problem_bank.py build <problems.json|problems.jsonl> <bank.db>")
+        sys.exit(1)
+
+    count = build_sqlite_bank(sys.argv[2], sys.argv[3])
+    print(f"Built {sys.argv[3]} with {count} problems")
+
+    flagged = AnswerIndex().build(iter_problem_file(sys.argv[2]))
+    for problem_id, issue in flagged.items():
+        print(f"  {problem_id}: {issue}")
+    if flagged:
+        print(f"{len(flagged)} answers cannot be canonicalized and will always be graded by the LLM")
@@ -0,0 +1,115 @@
+import os
+import sys
+import time
+import threading
+from collections import Counter
+from types import FrameType
+from typing import Dict, Any, List
+
+MAX_PROFILE_SECONDS = 60
+
+# The sampler only sees another thread's stack once that thread hands over the GIL. With the
+# default 5ms switch interval that is almost always at a call that releases it voluntarily
+# (os.urandom, socket I/O), so samples pile up there; a short interval while profiling
+# spreads them over where time is actually spent.
+_SWITCH_INTERVAL = 1e-5
+
+# Frames where a thread is parked rather than doing work, e.g. the event loop waiting in select().
+_IDLE_FUNCTIONS = {"select", "poll", "epoll", "wait", "_wait_for_tstate_lock", "acquire", "sleep"}
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}.{code.co_qualname}:{code.co_firstlineno}"
+
+
+class SamplingProfiler:
+    # Samples every thread's stack with sys._current_frames(), so it runs against live
+    # traffic without instrumenting or restarting the server.
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self._lock = threading.Lock()
+
+    def run(self, seconds: float) -> Dict[str, Any]:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(_SWITCH_INTERVAL)
+        try:
+            return self._sample(min(seconds, MAX_PROFILE_SECONDS))
+        finally:
+            sys.setswitchinterval(switch_interval)
+            self._lock.release()
+
+    def _sample(self, seconds: float) -> Dict[str, Any]:
+        own_thread = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks: Counter = Counter()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + seconds
+
+        while time.perf_counter() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_thread:
+                    continue
+                stack: List[str] = []
+                while frame is not None:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[tuple(reversed(stack))] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        return {
+            "seconds": round(time.perf_counter() - started, 3),
+            "interval": self.interval,
+            "samples": samples,
+            "stacks": stacks
+        }
+
+
+def summarize(profile: Dict[str, Any], top: int = 25) -> Dict[str, Any]:
+    stacks: Counter = profile["stacks"]
+    self_counts: Counter = Counter()
+    total_counts: Counter = Counter()
+    threads: Counter = Counter()
+    busy = 0
+
+    for stack, count in stacks.items():
+        threads[stack[0]] += count
+        leaf = stack[-1]
+        if leaf.rsplit(":", 1)[0].rsplit(".", 1)[-1] in _IDLE_FUNCTIONS:
+            continue
+        busy += count
+        self_counts[leaf] += count
+        for frame in set(stack[1:]):
+            total_counts[frame] += count
+
+    def ranked(counts: Counter) -> List[Dict[str, Any]]:
+        return [
+            {"function": function, "samples": count, "percent": round(100 * count / busy, 1)}
+            for function, count in counts.most_common(top)
+        ]
+
+    return {
+        "seconds": profile["seconds"],
+        "interval": profile["interval"],
+        "samples": profile["samples"],
+        "busy_samples": busy,
+        "threads": dict(threads),
+        "top_self": ranked(self_counts) if busy else [],
+        "top_total": ranked(total_counts) if busy else []
+    }
+
+
+def collapsed(profile: Dict[str, Any]) -> str:
+    # One "frame;frame;frame count" line per stack, the input format of flamegraph.pl and speedscope.
+    lines = [";".join(stack) + f" {count}" for stack, count in profile["stacks"].most_common()]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,281 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, Any, Optional, Tuple, BinaryIO
+from evaluator import MathEvaluator, PROMPT_VERSION
+from grading_cache import GradingCache
+from problem_bank import ProblemBank, InMemoryProblemBank, load_problem_bank
+from submission_log import iter_log
+from serialization import dumps, loads
+from upstream import UpstreamUnavailableError
+
+GRADE_FIELDS = ("score", "correct", "tier", "model", "prompt_version")
+
+Position = Tuple[int, int, int]
+
+MAX_BACKOFF = 60
+
+
+class RegradeStopped(Exception):
+    pass
+
+
+def parse_shard(spec: str) -> Tuple[int, int]:
+    index, count = (int(part) for part in spec.split("/", 1))
+    if not 0 <= index < count:
+        raise ValueError(f"Invalid shard {spec}")
+    return index, count
+
+
+def load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+async def regrade_entry(
+    evaluator: MathEvaluator,
+    bank: ProblemBank,
+    entry: Dict[str, Any],
+    outage_timeout: float
+) -> Dict[str, Any]:
+    problem_id = str(entry.get("problem_id", ""))
+    solution = entry.get("solution")
+    record = {
+        "problem_id": problem_id,
+        "session_id": entry.get("session_id"),
+        "solution": solution,
+        "old": {field: entry.get(field) for field in GRADE_FIELDS}
+    }
+
+    problem = bank.get(problem_id)
+    if problem is None:
+        record["error"] = f"Problem {problem_id} not found"
+        return record
+    if not solution:
+        record["error"] = "Missing solution"
+        return record
+
+    # An outage is not a property of the submission: wait it out rather than recording
+    # an error and moving the checkpoint past entries that were never regraded.
+    deadline = time.monotonic() + outage_timeout
+    attempt = 0
+    while True:
+        try:
+            evaluation = await evaluator.grade(
+                problem=problem["problem"],
+                expected_answer=problem["answer"],
+                agent_solution=solution,
+                explanation=problem.get("explanation", ""),
+                problem_id=problem_id,
+                difficulty=problem["difficulty"],
+                canonical=evaluator.canonical_answer(problem)
+            )
+            break
+        except UpstreamUnavailableError as e:
+            delay = max(e.retry_after or min(MAX_BACKOFF, 2 ** attempt), 0.5)
+            if time.monotonic() + delay > deadline:
+                raise RegradeStopped(f"Grading unavailable for over {outage_timeout:g}s: {str(e)}")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    record["new"] = {**{field: evaluation.get(field) for field in GRADE_FIELDS}, "prompt_version": PROMPT_VERSION}
+    record["changed"] = (
+        record["new"]["score"] != record["old"]["score"]
+        or record["new"]["correct"] != record["old"]["correct"]
+    )
+    return record
+
+
+def open_report(path: str, size: int) -> BinaryIO:
+    if size == 0:
+        return open(path, "wb")
+    report = open(path, "r+b")
+    # Drop anything written after the last checkpoint; those entries are regraded again.
+    report.truncate(size)
+    report.seek(size)
+    return report
+
+
+async def run(args: argparse.Namespace) -> None:
+    shard_index, shard_count = parse_shard(args.shard)
+    checkpoint = None if args.restart else load_checkpoint(args.checkpoint)
+    if checkpoint is not None and (checkpoint["logs"] != args.logs or checkpoint["shard"] != args.shard):
+        sys.exit(f"{args.checkpoint} belongs to a different run; pass --restart to start over")
+
+    state = checkpoint or {
+        "logs": args.logs,
+        "shard": args.shard,
+        "file": 0,
+        "offset": 0,
+        "line": 0,
+        "processed": 0,
+        "report_bytes": 0
+    }
+    if checkpoint is not None:
+        print(f"Resuming after {state['processed']} regraded submissions", file=sys.stderr)
+
+    bank = load_problem_bank(args.problems)
+    # A private in-memory cache: identical answers in the log are graded once, and
+    # gradings made with the old model or prompt are never reused.
+    evaluator = MathEvaluator(max_concurrency=args.workers, cache=GradingCache(max_entries=args.cache_size))
+    if isinstance(bank, InMemoryProblemBank):
+        evaluator.prepare_problems(bank.iterate())
+
+    report = open_report(args.output, state["report_bytes"])
+    queue: asyncio.Queue = asyncio.Queue(maxsize=args.workers * 4)
+    # Bounds how far finished entries may run ahead of a slow one while waiting to be written in order.
+    window = asyncio.Semaphore(args.workers * 64)
+    done: Dict[int, Tuple[bytes, Position]] = {}
+    next_seq = 0
+    started = time.monotonic()
+    last_progress = started
+    processed_at_start = state["processed"]
+
+    def write_checkpoint() -> None:
+        report.flush()
+        os.fsync(report.fileno())
+        state["report_bytes"] = report.tell()
+        save_checkpoint(args.checkpoint, state)
+
+    def write_ready() -> None:
+        nonlocal next_seq, last_progress
+        while next_seq in done:
+            data, (file_index, offset, line) = done.pop(next_seq)
+            report.write(data)
+            next_seq += 1
+            window.release()
+            state.update(file=file_index, offset=offset, line=line, processed=state["processed"] + 1)
+            if state["processed"] % args.checkpoint_every == 0:
+                write_checkpoint()
+
+        now = time.monotonic()
+        if now - last_progress >= 10:
+            last_progress = now
+            rate = (state["processed"] - processed_at_start) / (now - started)
+            print(f"Regraded {state['processed']} submissions ({rate:.1f}/s)", file=sys.stderr)
+
+    async def produce() -> None:
+        seq = 0
+        for file_index in range(state["file"], len(args.logs)):
+            resume = file_index == state["file"]
+            line = state["line"] if resume else 0
+            for offset, entry in iter_log(args.logs[file_index], state["offset"] if resume else 0):
+                line += 1
+                if entry is None or (line - 1) % shard_count != shard_index:
+                    continue
+                await window.acquire()
+                await queue.put((seq, (file_index, offset, line), entry))
+                seq += 1
+        for _ in range(args.workers):
+            await queue.put(None)
+
+    async def work() -> None:
+        while (item := await queue.get()) is not None:
+            seq, position, entry = item
+            record = await regrade_entry(evaluator, bank, entry, args.outage_timeout)
+            record["log"] = args.logs[position[0]]
+            record["line"] = position[2]
+            done[seq] = (dumps(record) + b"\n", position)
+            write_ready()
+
+    try:
+        # A task group cancels the other workers as soon as one stops the run.
+        async with asyncio.TaskGroup() as group:
+            group.create_task(produce())
+            for _ in range(args.workers):
+                group.create_task(work())
+    finally:
+        write_checkpoint()
+        report.close()
+
+
+def summarize_report(path: str) -> Dict[str, Any]:
+    summary = {
+        "total": 0,
+        "regraded": 0,
+        "errors": 0,
+        "changed": 0,
+        "became_correct": 0,
+        "became_incorrect": 0,
+        "old_average_score": 0.0,
+        "new_average_score": 0.0,
+        "old_tiers": {},
+        "new_tiers": {}
+    }
+    old_total = new_total = 0
+
+    with open(path, "rb") as f:
+        for line in f:
+            record = loads(line)
+            summary["total"] += 1
+            if "error" in record:
+                summary["errors"] += 1
+                continue
+
+            old, new = record["old"], record["new"]
+            summary["regraded"] += 1
+            summary["changed"] += record["changed"]
+            summary["became_correct"] += bool(new["correct"] and not old["correct"])
+            summary["became_incorrect"] += bool(old["correct"] and not new["correct"])
+            old_total += old["score"] or 0
+            new_total += new["score"] or 0
+            for key, grade in (("old_tiers", old), ("new_tiers", new)):
+                tier = str(grade["tier"])
+                summary[key][tier] = summary[key].get(tier, 0) + 1
+
+    if summary["regraded"]:
+        summary["old_average_score"] = round(old_total / summary["regraded"], 2)
+        summary["new_average_score"] = round(new_total / summary["regraded"], 2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Regrade logged submissions with the current evaluator")
+    parser.add_argument("logs", nargs="+", help="Submission log files (SUBMISSION_LOG_PATH), processed in order")
+    parser.add_argument("--problems", default=os.getenv("PROBLEM_BANK_PATH", "math_problems.json"))
+    parser.add_argument("--output", default="regrade_report.jsonl", help="Per-submission comparison report")
+    parser.add_argument("--summary", help="Aggregate comparison (default: <output>.summary.json)")
+    parser.add_argument("--checkpoint", help="Resume state (default: <output>.checkpoint)")
+    parser.add_argument("--checkpoint-every", type=int, default=1000, help="Submissions between checkpoints")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--workers", type=int, default=32, help="Concurrent gradings")
+    parser.add_argument("--cache-size", type=int, default=100000, help="Gradings remembered for duplicate answers")
+    parser.add_argument(
+        "--outage-timeout", type=float, default=600,
+        help="Seconds to keep retrying a submission while grading is unavailable before stopping the run"
+    )
+    parser.add_argument(
+        "--shard", default="0/1",
+        help="K/N: regrade every Nth submission starting at K, to split the log across processes"
+    )
+    args = parser.parse_args()
+
+    args.checkpoint = args.checkpoint or f"{args.output}.checkpoint"
+    args.summary = args.summary or f"{args.output}.summary.json"
+
+    try:
+        asyncio.run(run(args))
+    except* RegradeStopped as stopped:
+        # The checkpoint ends before the first submission that could not be graded.
+        sys.exit(f"{stopped.exceptions[0]}; rerun the same command to resume")
+
+    summary = summarize_report(args.output)
+    with open(args.summary, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,124 @@
+import os
+import signal
+import socket
+import asyncio
+import argparse
+import contextlib
 import multiprocessing
+from typing import List, Optional
 import uvicorn
-import time
 
 
-def run_agent_server():
-    uvicorn.run("main:agent_app", host="0.0.0.0", port=8000, log_level="info")
+class AppServer(uvicorn.Server):
+    @contextlib.contextmanager
+    def capture_signals(self):
+        # Several servers share one loop, so serve_apps() handles signals for all of them.
+        yield
 
 
-def run_launcher_server():
-    uvicorn.run("main:launcher_app", host="0.0.0.0", port=8001, log_level="info")
+def build_servers(args: argparse.Namespace) -> List[AppServer]:
+    return [
+        AppServer(uvicorn.Config(
+            app,
+            host=args.host,
+            port=port,
+            log_level="info",
+            timeout_graceful_shutdown=args.drain_timeout
+        ))
+        for app, port in (("main:agent_app", args.agent_port), ("main:launcher_app", args.launcher_port))
+    ]
+
+
+async def serve_apps(args: argparse.Namespace, sockets: Optional[List[socket.socket]] = None) -> None:
+    servers = build_servers(args)
+    loop = asyncio.get_running_loop()
+
+    def handle_exit(sig: int) -> None:
+        for server in servers:
+            if server.should_exit and sig == signal.SIGINT:
+                server.force_exit = True
+            server.should_exit = True
+
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, handle_exit, sig)
+
+    await asyncio.gather(*(
+        server.serve(sockets=[sockets[index]] if sockets else None)
+        for index, server in enumerate(servers)
+    ))
+
+
+def run_worker(args: argparse.Namespace, sockets: List[socket.socket]) -> None:
+    asyncio.run(serve_apps(args, sockets))
+
+
+def run_workers(args: argparse.Namespace) -> None:
+    sockets = [
+        uvicorn.Config("main:agent_app", host=args.host, port=port).bind_socket()
+        for port in (args.agent_port, args.launcher_port)
+    ]
+
+    context = multiprocessing.get_context("spawn")
+    workers = [
+        context.Process(target=run_worker, args=(args, sockets))
+        for _ in range(args.workers)
+    ]
+
+    def forward(sig: int, frame) -> None:
+        # Workers drain on SIGTERM; a second Ctrl+C reaches them directly and forces exit.
+        for worker in workers:
+            if worker.is_alive():
+                os.kill(worker.pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGINT, forward)
+    signal.signal(signal.SIGTERM, forward)
+
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    for sock in sockets:
+        sock.close()
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Run the agent and launcher servers")
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--agent-port", type=int, default=int(os.getenv("AGENT_PORT", "8000")))
+    parser.add_argument("--launcher-port", type=int, default=int(os.getenv("LAUNCHER_PORT", "8001")))
+    parser.add_argument(
+        "--workers", type=int, default=int(os.getenv("WORKERS", "1")),
+        help="Processes to run; each serves both apps from one event loop"
+    )
+    parser.add_argument(
+        "--drain-timeout", type=float, default=float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "30")),
+        help="Seconds to let in-flight requests and background tasks finish on shutdown"
+    )
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    os.environ["SHUTDOWN_DRAIN_TIMEOUT"] = str(args.drain_timeout)
+
+    if args.workers > 1:
+        # Workers are separate processes, so sessions, task results and gradings
+        # go through SQLite to be visible from every worker.
+        os.environ.setdefault("SESSION_STORE", "sqlite")
+        os.environ.setdefault("TASK_STORE_PATH", "tasks.db")
+        os.environ.setdefault("GRADING_CACHE_PATH", "grading_cache.db")
+
     print("Starting Math Evaluator Green Agent...")
     print("=" * 60)
-    print("\nAgent Server:    http://localhost:8000")
-    print("Launcher Server: http://localhost:8001")
+    print(f"\nAgent Server:    http://localhost:{args.agent_port}")
+    print(f"Launcher Server: http://localhost:{args.launcher_port}")
+    print(f"Workers:         {args.workers}")
     print("\nPress Ctrl+C to stop both servers\n")
     print("=" * 60)
-    
-    agent_process = multiprocessing.Process(target=run_agent_server)
-    launcher_process = multiprocessing.Process(target=run_launcher_server)
-    
-    try:
-        agent_process.start()
-        time.sleep(1)
-        launcher_process.start()
-        
-        agent_process.join()
-        launcher_process.join()
-    except KeyboardInterrupt:
-        print("\n\nStopping servers...")
-        agent_process.terminate()
-        launcher_process.terminate()
-        agent_process.join()
-        launcher_process.join()
-        print("Servers stopped.")
 
+    if args.workers > 1:
+        run_workers(args)
+    else:
+        asyncio.run(serve_apps(args))
+
+    print("Servers stopped.")
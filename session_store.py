@@ -0,0 +1,255 @@
+import os
+import time
+import asyncio
+import random
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+_MASK64 = (1 << 64) - 1
+_FEISTEL_ROUNDS = 4
+
+
+def _round_function(value: int, key: int) -> int:
+    value = ((value ^ key) * 0x9E3779B97F4A7C15) & _MASK64
+    value ^= value >> 29
+    value = (value * 0xBF58476D1CE4E5B9) & _MASK64
+    return value ^ (value >> 32)
+
+
+def permute_index(position: int, size: int, seed: int) -> int:
+    # Keyed Feistel network over the next even power of two, cycle-walking until the
+    # result falls inside [0, size). Bijective, so every position maps to a distinct index.
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    half_mask = (1 << half_bits) - 1
+    value = position
+
+    while True:
+        left, right = value >> half_bits, value & half_mask
+        for round_index in range(_FEISTEL_ROUNDS):
+            key = (seed + round_index * 0x632BE59BD9B4E019) & _MASK64
+            left, right = right, left ^ (_round_function(right, key) & half_mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+class SessionCursor:
+    __slots__ = ("seed", "size", "position", "last_seen")
+
+    def __init__(self, seed: int, size: int, position: int = 0, last_seen: float = 0.0):
+        self.seed = seed
+        self.size = size
+        self.position = position
+        self.last_seen = last_seen or time.time()
+
+
+class SessionStore(ABC):
+    def __init__(self, ttl: float = 3600, sweep_interval: float = 60):
+        self.ttl = ttl
+        self.sweep_interval = sweep_interval
+        self._last_sweep = time.time()
+
+    @abstractmethod
+    def create(self, session_id: str, size: int) -> None:
+        ...
+
+    @abstractmethod
+    def exists(self, session_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    def draw_index(self, session_id: str, size: int) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def attempted_count(self, session_id: str) -> Optional[int]:
+        ...
+
+    @abstractmethod
+    def expire_idle(self) -> int:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    # Request handlers use these. The in-memory store answers inline; the SQLite store may wait
+    # on other workers' write locks, so it runs them in a thread instead of on the event loop.
+    async def acreate(self, session_id: str, size: int) -> None:
+        self.create(session_id, size)
+
+    async def adraw_index(self, session_id: str, size: int) -> Optional[int]:
+        return self.draw_index(session_id, size)
+
+    async def aattempted_count(self, session_id: str) -> Optional[int]:
+        return self.attempted_count(session_id)
+
+    def _maybe_sweep(self) -> None:
+        now = time.time()
+        if now - self._last_sweep >= self.sweep_interval:
+            self._last_sweep = now
+            self.expire_idle()
+
+
+class InMemorySessionStore(SessionStore):
+    def __init__(self, ttl: float = 3600, sweep_interval: float = 60):
+        super().__init__(ttl, sweep_interval)
+        self._sessions: "OrderedDict[str, SessionCursor]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _touch(self, session_id: str) -> Optional[SessionCursor]:
+        session = self._sessions.get(session_id)
+        if session is not None:
+            session.last_seen = time.time()
+            self._sessions.move_to_end(session_id)
+        return session
+
+    def create(self, session_id: str, size: int) -> None:
+        self._maybe_sweep()
+        with self._lock:
+            self._sessions[session_id] = SessionCursor(random.getrandbits(63), size)
+            self._sessions.move_to_end(session_id)
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            return self._touch(session_id) is not None
+
+    def draw_index(self, session_id: str, size: int) -> Optional[int]:
+        self._maybe_sweep()
+        with self._lock:
+            session = self._touch(session_id)
+            if session is None:
+                session = SessionCursor(random.getrandbits(63), size)
+                self._sessions[session_id] = session
+
+            if session.position >= session.size:
+                return None
+
+            position = session.position
+            session.position += 1
+
+        return permute_index(position, session.size, session.seed)
+
+    def attempted_count(self, session_id: str) -> Optional[int]:
+        with self._lock:
+            session = self._touch(session_id)
+            return session.position if session is not None else None
+
+    def expire_idle(self) -> int:
+        cutoff = time.time() - self.ttl
+        expired = 0
+        with self._lock:
+            while self._sessions:
+                session_id, session = next(iter(self._sessions.items()))
+                if session.last_seen >= cutoff:
+                    break
+                del self._sessions[session_id]
+                expired += 1
+        return expired
+
+    def count(self) -> int:
+        return len(self._sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    def __init__(self, path: str, ttl: float = 3600, sweep_interval: float = 60):
+        super().__init__(ttl, sweep_interval)
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS session_cursors ("
+            "session_id TEXT PRIMARY KEY, seed INTEGER NOT NULL, size INTEGER NOT NULL, "
+            "position INTEGER NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS session_cursors_last_seen ON session_cursors (last_seen)"
+        )
+        # count() is polled from the event loop by /metrics; WAL reads on their own connection
+        # never wait for a writer or for the lock the writing threads hold.
+        self._reader = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._reader_lock = threading.Lock()
+
+    async def acreate(self, session_id: str, size: int) -> None:
+        await asyncio.to_thread(self.create, session_id, size)
+
+    async def adraw_index(self, session_id: str, size: int) -> Optional[int]:
+        return await asyncio.to_thread(self.draw_index, session_id, size)
+
+    async def aattempted_count(self, session_id: str) -> Optional[int]:
+        return await asyncio.to_thread(self.attempted_count, session_id)
+
+    def create(self, session_id: str, size: int) -> None:
+        self._maybe_sweep()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO session_cursors (session_id, seed, size, position, last_seen) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (session_id, random.getrandbits(63), size, time.time())
+            )
+
+    def exists(self, session_id: str) -> bool:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE session_cursors SET last_seen = ? WHERE session_id = ?",
+                (time.time(), session_id)
+            )
+            return cursor.rowcount > 0
+
+    def draw_index(self, session_id: str, size: int) -> Optional[int]:
+        self._maybe_sweep()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO session_cursors (session_id, seed, size, position, last_seen) "
+                "VALUES (?, ?, ?, 0, ?)",
+                (session_id, random.getrandbits(63), size, time.time())
+            )
+            # Drain RETURNING rows so the statement, and its write lock, finishes here.
+            rows = self._db.execute(
+                "UPDATE session_cursors SET position = position + 1, last_seen = ? "
+                "WHERE session_id = ? AND position < size RETURNING seed, size, position",
+                (time.time(), session_id)
+            ).fetchall()
+
+        if not rows:
+            return None
+
+        seed, session_size, position = rows[0]
+        return permute_index(position - 1, session_size, seed)
+
+    def attempted_count(self, session_id: str) -> Optional[int]:
+        with self._lock:
+            rows = self._db.execute(
+                "UPDATE session_cursors SET last_seen = ? WHERE session_id = ? RETURNING position",
+                (time.time(), session_id)
+            ).fetchall()
+            return rows[0][0] if rows else None
+
+    def expire_idle(self) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM session_cursors WHERE last_seen < ?",
+                (time.time() - self.ttl,)
+            )
+            return cursor.rowcount
+
+    def count(self) -> int:
+        with self._reader_lock:
+            return self._reader.execute("SELECT COUNT(*) FROM session_cursors").fetchone()[0]
+
+
+def create_session_store() -> SessionStore:
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    ttl = float(os.getenv("SESSION_TTL", "3600"))
+
+    if backend == "memory":
+        return InMemorySessionStore(ttl=ttl)
+    if backend == "sqlite":
+        return SQLiteSessionStore(os.getenv("SESSION_STORE_PATH", "sessions.db"), ttl=ttl)
+
+    raise ValueError(f"Unknown session store backend: {backend}")
@@ -0,0 +1,51 @@
+import os
+import time
+from typing import Dict, Any, Optional, Iterator, Tuple
+from jsonl_writer import JsonlWriter
+from serialization import loads
+
+
+class SubmissionLog(JsonlWriter):
+    @classmethod
+    def from_env(cls) -> "SubmissionLog":
+        return cls(
+            path=os.getenv("SUBMISSION_LOG_PATH") or None,
+            flush_interval=float(os.getenv("SUBMISSION_LOG_FLUSH_INTERVAL", "1")),
+            max_pending=int(os.getenv("SUBMISSION_LOG_MAX_PENDING", "100000"))
+        )
+
+
+def build_entry(
+    problem_id: str,
+    solution: str,
+    evaluation: Dict[str, Any],
+    prompt_version: str,
+    session_id: Optional[str] = None
+) -> Dict[str, Any]:
+    return {
+        "ts": round(time.time(), 3),
+        "session_id": session_id,
+        "problem_id": problem_id,
+        "solution": solution,
+        "score": evaluation["score"],
+        "correct": evaluation["correct"],
+        "tier": evaluation["tier"],
+        "model": evaluation.get("model"),
+        "prompt_version": prompt_version
+    }
+
+
+def iter_log(path: str, offset: int = 0) -> Iterator[Tuple[int, Optional[Dict[str, Any]]]]:
+    # Yields (offset after the line, entry); a torn or corrupt line yields None.
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            offset += len(line)
+            if not line.endswith(b"\n"):
+                # Still being written by the server; leave it for the next run.
+                return
+            try:
+                entry = loads(line)
+            except ValueError:
+                entry = None
+            yield offset, entry if isinstance(entry, dict) else None
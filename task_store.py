@@ -0,0 +1,183 @@
+import os
+import json
+import time
+import asyncio
+import contextvars
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple, Callable, Awaitable, List
+
+
+class TaskStore:
+    def __init__(
+        self,
+        max_tasks: int = 10000,
+        ttl: float = 3600,
+        path: Optional[str] = None
+    ):
+        self.max_tasks = max_tasks
+        self.ttl = ttl
+        self.path = path
+        self._tasks: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        self.evictions = 0
+
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS tasks ("
+                "task_id TEXT PRIMARY KEY, response TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            self._db.execute("DELETE FROM tasks WHERE expires_at <= ?", (time.time(),))
+
+    @classmethod
+    def from_env(cls) -> "TaskStore":
+        return cls(
+            max_tasks=int(os.getenv("TASK_RETENTION", "10000")),
+            ttl=float(os.getenv("TASK_TTL", "3600")),
+            path=os.getenv("TASK_STORE_PATH") or None
+        )
+
+    async def put(self, task_id: str, response: Dict[str, Any]) -> None:
+        expires_at = time.time() + self.ttl
+        self._tasks[task_id] = (expires_at, response)
+        self._tasks.move_to_end(task_id)
+        purge = self._evict()
+
+        if self._db is not None:
+            # Other workers may hold the write lock; wait for it in a thread, not on the loop.
+            await asyncio.to_thread(self._save, task_id, response, expires_at, purge)
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        entry = self._tasks.get(task_id)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+
+        if self._db is not None:
+            return await asyncio.to_thread(self._load, task_id)
+
+        return None
+
+    def _save(self, task_id: str, response: Dict[str, Any], expires_at: float, purge: bool) -> None:
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO tasks (task_id, response, expires_at) VALUES (?, ?, ?)",
+                (task_id, json.dumps(response), expires_at)
+            )
+            if purge:
+                self._db.execute("DELETE FROM tasks WHERE expires_at <= ?", (time.time(),))
+
+    def _load(self, task_id: str) -> Optional[Dict[str, Any]]:
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT response FROM tasks WHERE task_id = ? AND expires_at > ?",
+                (task_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def _evict(self) -> bool:
+        # Returns whether it is time to purge expired rows from the database as well.
+        now = time.time()
+        evicted = 0
+        while self._tasks:
+            task_id, (expires_at, _) = next(iter(self._tasks.items()))
+            if expires_at > now and len(self._tasks) <= self.max_tasks:
+                break
+            del self._tasks[task_id]
+            evicted += 1
+        self.evictions += evicted
+        return evicted > 0 and self.evictions % 1000 < evicted
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class TaskWorkerPool:
+    def __init__(
+        self,
+        store: TaskStore,
+        workers: int = 64,
+        max_queue: int = 10000
+    ):
+        self.store = store
+        self.workers = workers
+        self.max_queue = max_queue
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+
+    @classmethod
+    def from_env(cls, store: TaskStore) -> "TaskWorkerPool":
+        return cls(
+            store,
+            workers=int(os.getenv("TASK_WORKERS", "64")),
+            max_queue=int(os.getenv("TASK_QUEUE_SIZE", "10000"))
+        )
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._workers = []
+
+        self._workers = [worker for worker in self._workers if not worker.done()]
+        # Workers outlive the request that starts them; an empty context keeps that
+        # request's context variables (such as its trace) from leaking into later tasks.
+        for _ in range(self.workers - len(self._workers)):
+            self._workers.append(asyncio.create_task(self._run_worker(), context=contextvars.Context()))
+
+    async def submit(
+        self,
+        task_id: str,
+        pending: Dict[str, Any],
+        run: Callable[[], Awaitable[Dict[str, Any]]],
+        on_error: Callable[[Exception], Dict[str, Any]]
+    ) -> None:
+        self._ensure_started()
+        if self._queue.qsize() >= self.max_queue:
+            raise QueueFullError("Task queue is full")
+        # Stored before the task is queued, so a slow pending write can never land after the result.
+        await self.store.put(task_id, pending)
+        self._queue.put_nowait((task_id, run, on_error))
+
+    async def _run_worker(self) -> None:
+        while True:
+            task_id, run, on_error = await self._queue.get()
+            try:
+                response = await run()
+            except asyncio.CancelledError:
+                self._queue.task_done()
+                raise
+            except Exception as e:
+                response = on_error(e)
+            await self.store.put(task_id, response)
+            self._queue.task_done()
+
+    async def drain(self, timeout: Optional[float] = None) -> None:
+        if self._loop is not asyncio.get_running_loop():
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "workers": len(self._workers),
+            "retained": len(self.store),
+            "evictions": self.store.evictions
+        }
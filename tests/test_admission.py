@@ -0,0 +1,85 @@
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from admission import AdmissionController, AdmissionRejected  # noqa: E402
+
+
+class AdmissionControllerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_waiting_callers_are_served_round_robin(self):
+        admission = AdmissionController(max_active=1)
+        order = []
+        release = asyncio.Event()
+
+        async def hold():
+            async with admission.admit("busy"):
+                await release.wait()
+
+        async def grade(key, n):
+            async with admission.admit(key):
+                order.append((key, n))
+
+        holder = asyncio.ensure_future(hold())
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(grade("busy", n)) for n in range(3)]
+        await asyncio.sleep(0)
+        waiters.append(asyncio.ensure_future(grade("quiet", 0)))
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(holder, *waiters)
+
+        self.assertEqual(order[:2], [("busy", 0), ("quiet", 0)])
+        self.assertEqual(admission.active, 0)
+        self.assertEqual(admission.queued, 0)
+
+    async def test_caller_over_its_queue_share_gets_429(self):
+        admission = AdmissionController(max_active=1, max_queue_per_key=1)
+        await admission.acquire("holder")
+        waiter = asyncio.ensure_future(admission.acquire("k"))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await admission.acquire("k")
+        self.assertEqual(rejected.exception.status_code, 429)
+        self.assertIn("Retry-After", rejected.exception.headers())
+
+        admission.release()
+        await waiter
+        admission.release()
+        self.assertEqual(admission.active, 0)
+
+    async def test_full_queue_gets_503(self):
+        admission = AdmissionController(max_active=1, max_queue=1)
+        await admission.acquire("holder")
+        waiter = asyncio.ensure_future(admission.acquire("a"))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await admission.acquire("b")
+        self.assertEqual(rejected.exception.status_code, 503)
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        admission.release()
+        self.assertEqual((admission.active, admission.queued), (0, 0))
+
+    async def test_wait_past_the_timeout_is_rejected(self):
+        admission = AdmissionController(max_active=1, queue_timeout=0.01)
+        await admission.acquire("holder")
+
+        with self.assertRaises(AdmissionRejected) as rejected:
+            await admission.acquire("k")
+        self.assertEqual(rejected.exception.status_code, 503)
+        self.assertEqual(admission.queued, 0)
+
+    async def test_disabled_controller_admits_everything(self):
+        admission = AdmissionController(max_active=0)
+        async with admission.admit("k"):
+            self.assertEqual(admission.active, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
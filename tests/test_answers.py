@@ -0,0 +1,72 @@
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answers import canonicalize, fast_grade  # noqa: E402
+
+# (expected, provided, verdict); None means the fast path must leave the answer to the LLM.
+FAST_GRADE_CASES = [
+    ("42", "42", (True, "exact")),
+    ("42", "The answer is 42.", (True, "exact")),
+    ("1000", "1,000", (True, "exact")),
+    ("3/4", "0.75", (True, "numeric")),
+    ("25%", "25 percent", (True, "numeric")),
+    ("12", "12 cm", (True, "numeric")),
+    ("5", "5m", (True, "numeric")),
+    ("50", "50 dollars", (True, "numeric")),
+    ("42", "41", (False, "numeric")),
+    ("x+1", "1+x", (True, "symbolic")),
+    ("2, 3", "3 and 2", (True, "set")),
+    ("2, 3", "2 and 4", (False, "set")),
+    # Trailing words that are not units change the meaning or contradict the number.
+    ("42", "42 is incorrect", None),
+    ("5", "5 thousand", None),
+    ("2", "2 million", None),
+    ("1000", "1 thousand", None),
+    ("-4", "4% decrease", None),
+    ("-4", "4 percent decrease", None),
+    ("7", "7 apples", None),
+    # A percent sign, or the factor of 100 it implies, may or may not be what the question asks for.
+    ("20", "20%", None),
+    ("20", "0.2", None),
+    ("20%", "20", None),
+    ("20%", "0.2", None),
+    ("0.25", "25%", None),
+    ("0.25", "25", None),
+    ("20", "21%", (False, "numeric")),
+    ("20%", "21%", (False, "numeric")),
+    # Different or differently spelled units may be a correct conversion.
+    ("60 mph", "60 miles per hour", None),
+    ("5 km", "5000 m", None),
+]
+
+CANONICAL_CASES = [
+    ("42", "number", None),
+    ("-4", "number", None),
+    ("60 mph", "number", "mph"),
+    ("12 square units", "number", "square units"),
+    ("x^2 + 1", "expression", None),
+    ("{1, 2}", "set", None),
+    ("5 thousand", "text", None),
+    ("blue", "text", None),
+]
+
+
+class FastGradeTest(unittest.TestCase):
+    def test_fast_grade(self):
+        for expected, provided, verdict in FAST_GRADE_CASES:
+            with self.subTest(expected=expected, provided=provided):
+                self.assertEqual(fast_grade(expected, provided), verdict)
+
+    def test_canonicalize(self):
+        for answer, kind, unit in CANONICAL_CASES:
+            with self.subTest(answer=answer):
+                canonical = canonicalize(answer)
+                self.assertEqual(canonical.kind, kind)
+                self.assertEqual(canonical.unit, unit)
+
+
+if __name__ == "__main__":
+    unittest.main()
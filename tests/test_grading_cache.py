@@ -0,0 +1,113 @@
+import os
+import sys
+import asyncio
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from grading_cache import GradingCache  # noqa: E402
+
+
+class GradingCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_callers_share_one_computation(self):
+        cache = GradingCache()
+        calls = 0
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return {"score": 100}
+
+        results = await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(3)))
+
+        self.assertEqual(calls, 1)
+        self.assertEqual([value for value, _ in results], [{"score": 100}] * 3)
+        self.assertEqual([cached for _, cached in results], [False, True, True])
+        self.assertEqual(cache.coalesced, 2)
+        self.assertEqual(cache.get("k"), {"score": 100})
+
+    async def test_uncacheable_result_is_not_stored(self):
+        cache = GradingCache()
+
+        async def compute():
+            return {"score": 0, "error": True}
+
+        await cache.get_or_compute("k", compute, cacheable=lambda value: "error" not in value)
+
+        self.assertIsNone(cache.get("k"))
+
+    async def test_leader_failure_reaches_followers_and_is_not_cached(self):
+        cache = GradingCache()
+
+        async def compute():
+            await asyncio.sleep(0.01)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(
+            cache.get_or_compute("k", compute),
+            cache.get_or_compute("k", compute),
+            return_exceptions=True
+        )
+
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertEqual(cache.stats()["inflight"], 0)
+        self.assertIsNone(cache.get("k"))
+
+    async def test_cancelled_leader_does_not_cancel_followers(self):
+        cache = GradingCache()
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.05)
+            return {"score": 100}
+
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await started.wait()
+        follower = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        value, cached = await follower
+        self.assertEqual(value, {"score": 100})
+        self.assertTrue(cached)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(cache.get("k"), {"score": 100})
+
+    async def test_cancelled_follower_does_not_cancel_leader(self):
+        cache = GradingCache()
+        started = asyncio.Event()
+
+        async def compute():
+            started.set()
+            await asyncio.sleep(0.05)
+            return {"score": 100}
+
+        leader = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await started.wait()
+        follower = asyncio.ensure_future(cache.get_or_compute("k", compute))
+        await asyncio.sleep(0)
+        follower.cancel()
+
+        self.assertEqual(await leader, ({"score": 100}, False))
+
+    async def test_disk_entries_survive_a_new_cache(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "cache.db")
+
+        async def compute():
+            return {"score": 100}
+
+        await GradingCache(path=path).get_or_compute("k", compute)
+        reopened = GradingCache(path=path)
+
+        self.assertEqual(await reopened.get_or_compute("k", compute), ({"score": 100}, True))
+        self.assertEqual(reopened.disk_hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import sys
+import asyncio
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from idempotency import IdempotencyStore, IdempotencyConflict, fingerprint  # noqa: E402
+
+
+def responder(calls, response=None, delay=0.01):
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(delay)
+        return response or {"status": "completed", "n": len(calls)}
+    return compute
+
+
+class IdempotencyStoreTest(unittest.IsolatedAsyncioTestCase):
+    async def test_completed_response_is_replayed(self):
+        store = IdempotencyStore()
+        calls = []
+
+        first = await store.run("k", "f", responder(calls))
+        second = await store.run("k", "f", responder(calls))
+
+        self.assertEqual(first, ({"status": "completed", "n": 1}, False))
+        self.assertEqual(second, ({"status": "completed", "n": 1}, True))
+        self.assertEqual(len(calls), 1)
+
+    async def test_concurrent_repeat_attaches_to_the_running_request(self):
+        store = IdempotencyStore()
+        calls = []
+
+        results = await asyncio.gather(*(store.run("k", "f", responder(calls)) for _ in range(3)))
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([replayed for _, replayed in results], [False, True, True])
+        self.assertEqual(store.attached, 2)
+
+    async def test_unstorable_response_runs_again(self):
+        store = IdempotencyStore()
+        calls = []
+        storable = lambda response: response["status"] == "completed"  # noqa: E731
+
+        await store.run("k", "f", responder(calls, {"status": "failed"}), storable=storable)
+        await store.run("k", "f", responder(calls, {"status": "failed"}), storable=storable)
+
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(len(store), 0)
+
+    async def test_strict_key_reused_with_other_parameters_conflicts(self):
+        store = IdempotencyStore()
+        calls = []
+
+        await store.run("k", "f1", responder(calls))
+        with self.assertRaises(IdempotencyConflict):
+            await store.run("k", "f2", responder(calls))
+
+        running = asyncio.ensure_future(store.run("j", "f1", responder(calls)))
+        await asyncio.sleep(0)
+        with self.assertRaises(IdempotencyConflict):
+            await store.run("j", "f2", responder(calls))
+        await running
+
+    async def test_lenient_key_reused_with_other_parameters_runs_as_new_request(self):
+        store = IdempotencyStore()
+        calls = []
+
+        await store.run("k", "f1", responder(calls), strict=False)
+        response, replayed = await store.run("k", "f2", responder(calls), strict=False)
+
+        self.assertFalse(replayed)
+        self.assertEqual(response["n"], 2)
+        self.assertEqual(await store.run("k", "f2", responder(calls), strict=False), (response, True))
+
+    async def test_cancelled_leader_does_not_cancel_attached_requests(self):
+        store = IdempotencyStore()
+        calls = []
+
+        leader = asyncio.ensure_future(store.run("k", "f", responder(calls, delay=0.05)))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(store.run("k", "f", responder(calls)))
+        await asyncio.sleep(0)
+        leader.cancel()
+
+        response, replayed = await follower
+        self.assertEqual(response, {"status": "completed", "n": 1})
+        self.assertTrue(replayed)
+        with self.assertRaises(asyncio.CancelledError):
+            await leader
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(store), 1)
+
+    def test_fingerprint_ignores_key_order(self):
+        self.assertEqual(fingerprint("s", {"a": 1, "b": 2}), fingerprint("s", {"b": 2, "a": 1}))
+        self.assertNotEqual(fingerprint("s", {"a": 1}), fingerprint("s", {"a": 2}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import sys
+import sqlite3
+import asyncio
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from session_store import InMemorySessionStore, SQLiteSessionStore, permute_index  # noqa: E402
+
+
+class PermuteIndexTest(unittest.TestCase):
+    def test_is_a_permutation_for_every_size(self):
+        for size in (1, 2, 3, 7, 15, 16, 17, 100, 1000):
+            with self.subTest(size=size):
+                self.assertEqual(sorted(permute_index(i, size, 12345) for i in range(size)), list(range(size)))
+
+    def test_seed_changes_the_order(self):
+        orders = {tuple(permute_index(i, 50, seed) for i in range(50)) for seed in (1, 2, 3)}
+        self.assertEqual(len(orders), 3)
+
+
+class SessionStoreCases:
+    def make_store(self):
+        raise NotImplementedError
+
+    def test_draws_every_problem_once_then_none(self):
+        store = self.make_store()
+        store.create("s", 20)
+
+        drawn = [store.draw_index("s", 20) for _ in range(20)]
+
+        self.assertEqual(sorted(drawn), list(range(20)))
+        self.assertIsNone(store.draw_index("s", 20))
+        self.assertEqual(store.attempted_count("s"), 20)
+
+    def test_unknown_session_is_created_on_first_draw(self):
+        store = self.make_store()
+
+        self.assertIsNone(store.attempted_count("new"))
+        self.assertIsNotNone(store.draw_index("new", 5))
+        self.assertEqual(store.attempted_count("new"), 1)
+        self.assertEqual(store.count(), 1)
+
+    def test_idle_sessions_expire(self):
+        store = self.make_store()
+        store.ttl = -1
+        store.create("s", 5)
+
+        self.assertEqual(store.expire_idle(), 1)
+        self.assertIsNone(store.attempted_count("s"))
+
+    def test_async_methods_match_sync_ones(self):
+        store = self.make_store()
+
+        async def run():
+            await store.acreate("s", 3)
+            drawn = [await store.adraw_index("s", 3) for _ in range(4)]
+            return drawn, await store.aattempted_count("s")
+
+        drawn, attempted = asyncio.run(run())
+        self.assertEqual(sorted(drawn[:3]), [0, 1, 2])
+        self.assertIsNone(drawn[3])
+        self.assertEqual(attempted, 3)
+
+
+class InMemorySessionStoreTest(SessionStoreCases, unittest.TestCase):
+    def make_store(self):
+        return InMemorySessionStore()
+
+
+class SQLiteSessionStoreTest(SessionStoreCases, unittest.TestCase):
+    def make_store(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return SQLiteSessionStore(os.path.join(directory.name, "sessions.db"))
+
+    def test_draws_are_shared_between_stores_on_one_file(self):
+        first = self.make_store()
+        second = SQLiteSessionStore(first.path)
+        first.create("s", 10)
+
+        drawn = [(first if i % 2 else second).draw_index("s", 10) for i in range(10)]
+
+        self.assertEqual(sorted(drawn), list(range(10)))
+
+    def test_locked_database_does_not_block_the_event_loop(self):
+        store = self.make_store()
+        store.create("s", 10)
+        other = sqlite3.connect(store.path, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute("BEGIN IMMEDIATE")
+
+        async def run():
+            draw = asyncio.ensure_future(store.adraw_index("s", 10))
+            ticks = 0
+            while ticks < 10:
+                await asyncio.sleep(0.01)
+                ticks += 1
+            self.assertFalse(draw.done())
+            other.execute("COMMIT")
+            return await draw
+
+        self.assertIsNotNone(asyncio.run(run()))
+
+
+if __name__ == "__main__":
+    unittest.main()
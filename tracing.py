@@ -0,0 +1,159 @@
+import os
+import re
+import time
+import uuid
+import random
+from contextlib import nullcontext
+from contextvars import ContextVar
+from typing import Dict, Any, List, Optional, Tuple, Union
+from jsonl_writer import JsonlWriter
+
+TRACE_HEADER = b"x-trace"
+
+_METRIC_NAME_RE = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+_current: ContextVar[Optional["Trace"]] = ContextVar("trace", default=None)
+
+_NO_SPAN = nullcontext()
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        # (name, offset from the start of the request, duration), both in seconds.
+        self.spans: List[Tuple[str, float, float]] = []
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.start
+
+    def totals(self) -> Dict[str, float]:
+        totals: Dict[str, float] = {}
+        for name, _, duration in self.spans:
+            totals[name] = totals.get(name, 0.0) + duration
+        return totals
+
+    def server_timing(self) -> str:
+        entries = [
+            f"{_METRIC_NAME_RE.sub('_', name)};dur={duration * 1000:.2f}"
+            for name, duration in self.totals().items()
+        ]
+        entries.append(f"total;dur={self.elapsed() * 1000:.2f}")
+        return ", ".join(entries)
+
+    def to_dict(self, **fields: Any) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "ts": round(self.started_at, 3),
+            "duration_ms": round(self.elapsed() * 1000, 3),
+            **fields,
+            "spans": [
+                {"name": name, "start_ms": round(offset * 1000, 3), "duration_ms": round(duration * 1000, 3)}
+                for name, offset, duration in self.spans
+            ]
+        }
+
+
+class _Span:
+    __slots__ = ("trace", "name", "started")
+
+    def __init__(self, trace: Trace, name: str):
+        self.trace = trace
+        self.name = name
+
+    def __enter__(self) -> "_Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        ended = time.perf_counter()
+        self.trace.spans.append((self.name, self.started - self.trace.start, ended - self.started))
+
+
+def span(name: str) -> Union[_Span, nullcontext]:
+    # Costs one context variable lookup when the request is not being traced.
+    trace = _current.get()
+    if trace is None:
+        return _NO_SPAN
+    return _Span(trace, name)
+
+
+class Tracer:
+    def __init__(self, sample_rate: float = 0.0, path: Optional[str] = None, flush_interval: float = 1.0):
+        self.sample_rate = sample_rate
+        # One line per trace.
+        self.log = JsonlWriter(path, flush_interval)
+        self.traced = 0
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        return cls(
+            sample_rate=float(os.getenv("TRACE_SAMPLE_RATE", "0")),
+            path=os.getenv("TRACE_PATH") or None,
+            flush_interval=float(os.getenv("TRACE_FLUSH_INTERVAL", "1"))
+        )
+
+    def sampled(self, forced: bool = False) -> bool:
+        return forced or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def export(self, trace: Trace, **fields: Any) -> None:
+        self.traced += 1
+        self.log.record(trace.to_dict(**fields))
+
+    async def close(self) -> None:
+        await self.log.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "sample_rate": self.sample_rate,
+            "traced": self.traced,
+            "export": self.log.stats()
+        }
+
+
+class TracingMiddleware:
+    def __init__(self, app, tracer: Tracer, app_name: str):
+        self.app = app
+        self.tracer = tracer
+        self.app_name = app_name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        forced = any(
+            name == TRACE_HEADER and value.lower() in (b"1", b"true")
+            for name, value in scope["headers"]
+        )
+        if not self.tracer.sampled(forced):
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(f"{scope['method']} {scope['path']}")
+        token = _current.set(trace)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Streamed responses start before their work is done; their full breakdown is in the trace file.
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        (b"server-timing", trace.server_timing().encode()),
+                        (b"x-trace-id", trace.trace_id.encode())
+                    ]
+                }
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            self.tracer.export(trace, app=self.app_name, status=status)
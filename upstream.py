@@ -0,0 +1,279 @@
+import os
+import time
+import random
+import asyncio
+from email.utils import parsedate_to_datetime
+from typing import Dict, Any, Optional, TYPE_CHECKING
+
+import httpx
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+from metrics import llm_latency, llm_tokens, llm_errors
+
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504}
+
+
+class UpstreamUnavailableError(Exception):
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(UpstreamUnavailableError):
+    pass
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+                self._refill()
+            self._tokens -= tokens
+
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def before_call(self) -> None:
+        state = self.state
+        if state == "open":
+            remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+            raise CircuitOpenError("Upstream circuit breaker is open", retry_after=max(remaining, 0.0))
+        if state == "half_open":
+            if self._probe_in_flight:
+                raise CircuitOpenError("Upstream circuit breaker is probing", retry_after=1.0)
+            self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.opened_at is not None or self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+    def release(self) -> None:
+        self._probe_in_flight = False
+
+
+def parse_retry_after(headers: Optional[httpx.Headers]) -> Optional[float]:
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+
+    try:
+        return max(float(retry_after), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        return max(parsedate_to_datetime(retry_after).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+def token_usage(response: Any) -> Optional[Dict[str, int]]:
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    details = getattr(usage, "prompt_tokens_details", None)
+    return {
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "cached_tokens": (getattr(details, "cached_tokens", None) or 0) if details is not None else 0,
+        "completion_tokens": usage.completion_tokens or 0
+    }
+
+
+class UpstreamClient:
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 100,
+        keepalive_expiry: float = 30,
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 20,
+        rate_limit: float = 0,
+        rate_burst: Optional[float] = None,
+        breaker_threshold: int = 5,
+        breaker_reset: float = 30
+    ):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.client = self._build_client()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.bucket = TokenBucket(rate_limit, rate_burst)
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_reset)
+        self.retries = 0
+        self.failures = 0
+
+    @classmethod
+    def from_env(cls, api_key: Optional[str] = None) -> "UpstreamClient":
+        return cls(
+            api_key=api_key,
+            base_url=os.getenv("OPENAI_BASE_URL") or None,
+            max_connections=int(os.getenv("UPSTREAM_MAX_CONNECTIONS", "100")),
+            max_keepalive_connections=int(os.getenv("UPSTREAM_MAX_KEEPALIVE", "100")),
+            keepalive_expiry=float(os.getenv("UPSTREAM_KEEPALIVE_EXPIRY", "30")),
+            max_retries=int(os.getenv("UPSTREAM_MAX_RETRIES", "4")),
+            backoff_base=float(os.getenv("UPSTREAM_BACKOFF_BASE", "0.5")),
+            backoff_max=float(os.getenv("UPSTREAM_BACKOFF_MAX", "20")),
+            rate_limit=float(os.getenv("UPSTREAM_RATE_LIMIT", "0")),
+            rate_burst=float(os.getenv("UPSTREAM_RATE_BURST", "0")) or None,
+            breaker_threshold=int(os.getenv("UPSTREAM_BREAKER_THRESHOLD", "5")),
+            breaker_reset=float(os.getenv("UPSTREAM_BREAKER_RESET", "30"))
+        )
+
+    def _build_client(self) -> "AsyncOpenAI":
+        # The SDK is the slowest import in the service; only processes that grade load it.
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=httpx.AsyncClient(limits=self.limits),
+            max_retries=0
+        )
+
+    def _client_for_loop(self) -> "AsyncOpenAI":
+        # Pooled connections belong to the event loop that opened them.
+        loop = asyncio.get_running_loop()
+        if self._loop is None:
+            self._loop = loop
+        elif loop is not self._loop:
+            self._loop = loop
+            self.client = self._build_client()
+            self.bucket = TokenBucket(self.bucket.rate, self.bucket.capacity)
+        return self.client
+
+    def _backoff(self, attempt: int, retry_after: Optional[float]) -> float:
+        if retry_after is not None:
+            return min(retry_after, self.backoff_max) + random.uniform(0, self.backoff_base)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def chat_completion(self, timeout: float, **kwargs: Any) -> Any:
+        import openai
+
+        last_error: Optional[Exception] = None
+        retry_after: Optional[float] = None
+
+        client = self._client_for_loop()
+
+        model = kwargs.get("model", "")
+
+        for attempt in range(self.max_retries + 1):
+            await self.bucket.acquire()
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                llm_errors.inc(model, "circuit_open")
+                raise
+
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    client.chat.completions.create(timeout=timeout, **kwargs),
+                    timeout=timeout
+                )
+            except openai.APIStatusError as e:
+                llm_errors.inc(model, f"status_{e.status_code}")
+                retry_after = parse_retry_after(e.response.headers)
+                if e.status_code not in RETRYABLE_STATUS_CODES and e.status_code < 500:
+                    self.breaker.release()
+                    raise
+                if e.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.release()
+                last_error = e
+            except (openai.APIConnectionError, asyncio.TimeoutError) as e:
+                timed_out = isinstance(e, (asyncio.TimeoutError, openai.APITimeoutError))
+                llm_errors.inc(model, "timeout" if timed_out else "connection")
+                retry_after = None
+                self.breaker.record_failure()
+                last_error = e
+            except BaseException:
+                self.breaker.release()
+                raise
+            else:
+                self.breaker.record_success()
+                llm_latency.observe(time.perf_counter() - started, model)
+                usage = token_usage(response)
+                if usage is not None:
+                    llm_tokens.inc(model, "prompt", amount=usage["prompt_tokens"])
+                    llm_tokens.inc(model, "cached", amount=usage["cached_tokens"])
+                    llm_tokens.inc(model, "completion", amount=usage["completion_tokens"])
+                return response
+
+            self.failures += 1
+            if attempt < self.max_retries and self.breaker.state == "closed":
+                self.retries += 1
+                await asyncio.sleep(self._backoff(attempt, retry_after))
+            else:
+                break
+
+        message = "timed out" if isinstance(last_error, asyncio.TimeoutError) else str(last_error)
+        raise UpstreamUnavailableError(f"Upstream unavailable: {message}", retry_after=retry_after)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.failures,
+            "retries": self.retries,
+            "failures": self.failures
+        }